@@ -1,35 +1,287 @@
-from flask import Flask, render_template, request, jsonify
-from inference_calculator import LLMInferenceCalculator
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+from inference_calculator import LLMInferenceCalculator, DEPLOYMENT_FACTORS, PRECISION_BYTES, KV_CACHE_PRECISIONS
+from capacity_planner import CapacityPlanner
+from uncertainty import UncertaintyEstimator
+from jobs import JobManager, COMPLETED
+import itertools
 import json
+import math
 
 app = Flask(__name__)
 calculator = LLMInferenceCalculator()
+planner = CapacityPlanner(calculator)
+estimator = UncertaintyEstimator(calculator)
+jobs = JobManager(calculator.catalog_path)
+
+# Upper bound on the number of scenarios accepted by /calculate_batch
+MAX_BATCH_SCENARIOS = 1000000
+
+# Upper bound on the number of Monte Carlo samples accepted by /uncertainty
+MAX_UNCERTAINTY_SAMPLES = 1000000
+
+# Grid spec keys for /calculate_batch, in the order scenarios are expanded
+GRID_AXES = [
+    ('model_size', '7B'),
+    ('tokens', 1024),
+    ('batch_size', 1),
+    ('hardware_type', 'RTX4090'),
+    ('deployment_mode', 'local'),
+    ('requests_per_hour', 100),
+    ('latency_mode', 'empirical'),
+    ('prompt_tokens', 0),
+    ('precision', 'fp16'),
+    ('kv_precision', None),
+    ('draft_model', None),
+    ('speculative_tokens', 4),
+    ('acceptance_rate', 0.7),
+    ('shared_prefix_tokens', 0),
+    ('prefix_cache_hit_rate', 0.0),
+    ('cost_mode', 'per_request'),
+]
+
+
+def parse_scenario(data):
+    """Extract calculator parameters from a request payload, applying defaults"""
+    return {
+        'model_size': data.get('model_size', '7B'),
+        'tokens': int(data.get('tokens', 1024)),
+        'batch_size': int(data.get('batch_size', 1)),
+        'hardware_type': data.get('hardware_type', 'RTX4090'),
+        'deployment_mode': data.get('deployment_mode', 'local'),
+        'requests_per_hour': int(data.get('requests_per_hour', 100)),
+        'latency_mode': data.get('latency_mode', 'empirical'),
+        'prompt_tokens': int(data.get('prompt_tokens', 0)),
+        'precision': data.get('precision', 'fp16'),
+        'kv_precision': data.get('kv_precision'),
+        'draft_model': data.get('draft_model'),
+        'speculative_tokens': int(data.get('speculative_tokens', 4)),
+        'acceptance_rate': float(data.get('acceptance_rate', 0.7)),
+        'shared_prefix_tokens': int(data.get('shared_prefix_tokens', 0)),
+        'prefix_cache_hit_rate': float(data.get('prefix_cache_hit_rate', 0.0)),
+        'cost_mode': data.get('cost_mode', 'per_request')
+    }
+
+
+def expand_grid_axis(value):
+    """Expand a grid axis given as a value, a list or a {start, stop, step} range"""
+    if isinstance(value, dict):
+        return range(int(value['start']), int(value['stop']), int(value.get('step', 1)))
+    if isinstance(value, list):
+        return value
+    return [value]
+
+def iter_grid(axes):
+    """Scenario dicts for every combination of expanded GRID_AXES values
+    
+    A generator function, so nothing is expanded until the first row is
+    requested; itertools.product copies its inputs as soon as it is called.
+    """
+    names = [name for name, _ in GRID_AXES]
+    for values in itertools.product(*axes):
+        yield dict(zip(names, values))
+
+@app.before_request
+def refresh_catalog():
+    # Pick up edits to the hardware/model catalog without a restart
+    calculator.reload_catalog_if_changed()
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    # Form options come from the catalog, so models and hardware added to it show up without edits here
+    catalog = calculator.catalog
+    return render_template('index.html', models=catalog.model_specs, hardware_specs=catalog.hardware_specs,
+                           deployment_modes=list(DEPLOYMENT_FACTORS), defaults=dict(GRID_AXES))
 
 @app.route('/calculate', methods=['POST'])
 def calculate():
     try:
         data = request.get_json()
         
-        # Extract parameters
-        model_size = data.get('model_size', '7B')
-        tokens = int(data.get('tokens', 1024))
-        batch_size = int(data.get('batch_size', 1))
-        hardware_type = data.get('hardware_type', 'RTX4090')
-        deployment_mode = data.get('deployment_mode', 'local')
-        requests_per_hour = int(data.get('requests_per_hour', 100))
-        
         # Calculate metrics
-        result = calculator.calculate_inference_metrics(
-            model_size=model_size,
-            tokens=tokens,
-            batch_size=batch_size,
-            hardware_type=hardware_type,
-            deployment_mode=deployment_mode,
-            requests_per_hour=requests_per_hour
+        result = calculator.calculate_inference_metrics(**parse_scenario(data))
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/calculate_batch', methods=['POST'])
+def calculate_batch():
+    """Calculate many scenarios, streaming one NDJSON line per scenario
+    
+    The body is either {"scenarios": [{...}, ...]} with the same fields as
+    /calculate, or {"grid": {...}} where each field is a value, a list or a
+    {"start", "stop", "step"} range and every combination is evaluated.
+    Rows are computed lazily as the response is written, and a failing
+    scenario produces an error row instead of aborting the stream.
+    """
+    data = request.get_json(silent=True) or {}
+    
+    if 'scenarios' in data:
+        scenarios = data['scenarios']
+        if not isinstance(scenarios, list):
+            return jsonify({'success': False, 'error': "'scenarios' must be a list"}), 400
+        total = len(scenarios)
+    elif 'grid' in data:
+        grid = data['grid']
+        if not isinstance(grid, dict):
+            return jsonify({'success': False, 'error': "'grid' must be an object"}), 400
+        try:
+            axes = [expand_grid_axis(grid.get(name, default)) for name, default in GRID_AXES]
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'Invalid grid spec: {e}'}), 400
+        total = math.prod(len(axis) for axis in axes)
+        scenarios = iter_grid(axes)
+    else:
+        return jsonify({'success': False, 'error': "Request must contain 'scenarios' or 'grid'"}), 400
+    
+    if total > MAX_BATCH_SCENARIOS:
+        return jsonify({
+            'success': False,
+            'error': f'Batch of {total} scenarios exceeds the limit of {MAX_BATCH_SCENARIOS}'
+        }), 400
+    
+    def generate():
+        for index, scenario in enumerate(scenarios):
+            try:
+                result = calculator.calculate_inference_metrics(**parse_scenario(scenario))
+                row = {'index': index, 'success': True, 'result': result}
+            except Exception as e:
+                row = {'index': index, 'success': False, 'error': str(e)}
+            yield json.dumps(row, separators=(',', ':')) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Total-Scenarios': str(total)})
+
+@app.route('/kv_cache', methods=['POST'])
+def kv_cache():
+    """Paged KV cache capacity for a model/hardware pair and a context-length mix"""
+    try:
+        data = request.get_json()
+        context_lengths = data.get('context_lengths', [1024])
+        if not isinstance(context_lengths, list):
+            context_lengths = [context_lengths]
+        
+        result = calculator.calculate_kv_cache(
+            model_size=data.get('model_size', '7B'),
+            hardware_type=data.get('hardware_type', 'RTX4090'),
+            context_lengths=[int(length) for length in context_lengths],
+            block_size=int(data.get('block_size', 16)),
+            precision=data.get('precision', 'fp16'),
+            kv_precision=data.get('kv_precision')
+        )
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/parallelism', methods=['POST'])
+def parallelism():
+    """Tensor/pipeline-parallel sharding plan for a scenario"""
+    try:
+        data = request.get_json()
+        scenario = parse_scenario(data)
+        
+        result = calculator.plan_parallelism(
+            model_size=scenario['model_size'],
+            tokens=scenario['tokens'],
+            batch_size=scenario['batch_size'],
+            hardware_type=scenario['hardware_type'],
+            deployment_mode=scenario['deployment_mode'],
+            requests_per_hour=scenario['requests_per_hour'],
+            precision=scenario['precision'],
+            kv_precision=scenario['kv_precision'],
+            prompt_tokens=scenario['prompt_tokens']
+        )
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/plan', methods=['POST'])
+def plan():
+    """Cheapest fleet and cost/latency/headroom Pareto frontier for a workload"""
+    try:
+        data = request.get_json()
+        
+        result = planner.plan(
+            model_size=data.get('model_size', '7B'),
+            requests_per_hour=float(data.get('requests_per_hour', 100)),
+            prompt_tokens=data.get('prompt_tokens', 512),
+            output_tokens=data.get('output_tokens', 256),
+            latency_slo_ms=float(data.get('latency_slo_ms', 5000)),
+            hardware_types=data.get('hardware_types'),
+            deployment_modes=data.get('deployment_modes'),
+            batch_sizes=data.get('batch_sizes'),
+            precisions=data.get('precisions'),
+            max_gpus=int(data.get('max_gpus', 1024))
+        )
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/uncertainty', methods=['POST'])
+def uncertainty():
+    """p5/p50/p95 latency, tokens/sec and cost from Monte Carlo sampling
+    
+    Uses the same fields as /calculate; tokens and prompt_tokens may also be
+    lists of observed lengths. Optional num_samples, tokens_cv,
+    efficiency_cv, price_cv and seed control the sampling.
+    """
+    try:
+        data = request.get_json()
+        num_samples = int(data.get('num_samples', 100000))
+        if num_samples > MAX_UNCERTAINTY_SAMPLES:
+            raise ValueError(f"num_samples is limited to {MAX_UNCERTAINTY_SAMPLES}")
+        tokens = data.get('tokens', 1024)
+        prompt_tokens = data.get('prompt_tokens', 0)
+        
+        result = estimator.estimate(
+            model_size=data.get('model_size', '7B'),
+            tokens=tokens if isinstance(tokens, list) else int(tokens),
+            batch_size=int(data.get('batch_size', 1)),
+            hardware_type=data.get('hardware_type', 'RTX4090'),
+            deployment_mode=data.get('deployment_mode', 'local'),
+            requests_per_hour=float(data.get('requests_per_hour', 100)),
+            latency_mode=data.get('latency_mode', 'empirical'),
+            prompt_tokens=prompt_tokens if isinstance(prompt_tokens, list) else int(prompt_tokens),
+            precision=data.get('precision', 'fp16'),
+            kv_precision=data.get('kv_precision'),
+            shared_prefix_tokens=int(data.get('shared_prefix_tokens', 0)),
+            prefix_cache_hit_rate=float(data.get('prefix_cache_hit_rate', 0.0)),
+            num_samples=num_samples,
+            tokens_cv=float(data.get('tokens_cv', 0.3)),
+            efficiency_cv=float(data.get('efficiency_cv', 0.15)),
+            price_cv=float(data.get('price_cv', 0.1)),
+            seed=data.get('seed', 0)
         )
         
         return jsonify({
@@ -43,9 +295,201 @@ def calculate():
             'error': str(e)
         }), 400
 
+@app.route('/limits', methods=['POST'])
+def limits():
+    """Largest batch size, token count and concurrency that fit the hardware
+    
+    Uses the same fields as /calculate plus an optional latency_slo_ms. The
+    batch size limit is for the given tokens, the token limit for the given
+    batch size, and concurrency for sequences of prompt_tokens + tokens.
+    """
+    try:
+        data = request.get_json()
+        scenario = parse_scenario(data)
+        latency_slo_ms = data.get('latency_slo_ms')
+        latency_slo_ms = float(latency_slo_ms) if latency_slo_ms is not None else None
+        common = {
+            'hardware_type': scenario['hardware_type'],
+            'deployment_mode': scenario['deployment_mode'],
+            'latency_slo_ms': latency_slo_ms,
+            'prompt_tokens': scenario['prompt_tokens'],
+            'precision': scenario['precision'],
+            'kv_precision': scenario['kv_precision']
+        }
+        
+        result = {
+            'batch_size': calculator.solve_max_batch_size(
+                scenario['model_size'], scenario['tokens'], latency_mode=scenario['latency_mode'], **common),
+            'tokens': calculator.solve_max_tokens(
+                scenario['model_size'], scenario['batch_size'], latency_mode=scenario['latency_mode'], **common),
+            'concurrent_sequences': calculator.solve_max_concurrent_sequences(
+                scenario['model_size'], scenario['prompt_tokens'] + scenario['tokens'], **common)
+        }
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Start a background job and return its id
+    
+    The body is {"type": "batch" | "sweep" | "simulate" | "plan", ...}:
+    batch takes "scenarios" or "grid" like /calculate_batch; sweep takes
+    calculate_sweep arguments (lists or {start, stop, step} ranges);
+    simulate takes queue simulator settings and a list of
+    requests_per_hour; plan takes the /plan fields.
+    """
+    try:
+        data = request.get_json()
+        job_type = data.get('type')
+        
+        if job_type == 'batch':
+            if 'grid' in data:
+                axes = [expand_grid_axis(data['grid'].get(name, default)) for name, default in GRID_AXES]
+                total = math.prod(len(axis) for axis in axes)
+                raw_scenarios = iter_grid(axes)
+            else:
+                raw_scenarios = data['scenarios']
+                total = len(raw_scenarios)
+            # Checked before any scenario is built, so oversized grids are never expanded
+            if total > MAX_BATCH_SCENARIOS:
+                raise ValueError(f'Batch of {total} scenarios exceeds the limit of {MAX_BATCH_SCENARIOS}')
+            job = jobs.submit_batch([parse_scenario(scenario) for scenario in raw_scenarios])
+        elif job_type == 'sweep':
+            job = jobs.submit_sweep({
+                'model_sizes': list(expand_grid_axis(data.get('model_sizes', ['7B']))),
+                'tokens': [int(t) for t in expand_grid_axis(data.get('tokens', [1024]))],
+                'batch_sizes': [int(b) for b in expand_grid_axis(data.get('batch_sizes', [1]))],
+                'hardware_types': list(expand_grid_axis(
+                    data.get('hardware_types', list(calculator.hardware_specs.keys())))),
+                'deployment_modes': list(expand_grid_axis(data.get('deployment_modes', ['local', 'cloud', 'edge']))),
+                'requests_per_hour': [int(r) for r in expand_grid_axis(data.get('requests_per_hour', [100]))],
+                'precisions': list(expand_grid_axis(data.get('precisions', ['fp16']))),
+                'kv_precision': data.get('kv_precision'),
+                'cost_mode': data.get('cost_mode', 'per_request')
+            })
+        elif job_type == 'simulate':
+            rates = data.get('requests_per_hour', [1000])
+            job = jobs.submit_simulation({
+                'model_size': data.get('model_size', '7B'),
+                'hardware_type': data.get('hardware_type', 'A100'),
+                'deployment_mode': data.get('deployment_mode', 'local'),
+                'max_batch_size': int(data.get('max_batch_size', 64)),
+                'precision': data.get('precision', 'fp16'),
+                'kv_precision': data.get('kv_precision'),
+                'num_requests': int(data.get('num_requests', 10000)),
+                'prompt_tokens': data.get('prompt_tokens', 512),
+                'output_tokens': data.get('output_tokens', 256),
+                'arrival_process': data.get('arrival_process', 'poisson'),
+                'seed': data.get('seed', 0)
+            }, [float(rate) for rate in (rates if isinstance(rates, list) else [rates])])
+        elif job_type == 'plan':
+            job = jobs.submit_plan({
+                'model_size': data.get('model_size', '7B'),
+                'requests_per_hour': float(data.get('requests_per_hour', 100)),
+                'prompt_tokens': data.get('prompt_tokens', 512),
+                'output_tokens': data.get('output_tokens', 256),
+                'latency_slo_ms': float(data.get('latency_slo_ms', 5000)),
+                'hardware_types': data.get('hardware_types') or list(calculator.hardware_specs.keys()),
+                'deployment_modes': data.get('deployment_modes'),
+                'batch_sizes': data.get('batch_sizes'),
+                'precisions': data.get('precisions'),
+                'max_gpus': int(data.get('max_gpus', 1024))
+            })
+        else:
+            raise ValueError(f"Unknown job type: {job_type}")
+        
+        return jsonify({
+            'success': True,
+            'result': job.info()
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/jobs')
+def list_jobs():
+    return jsonify({
+        'success': True,
+        'result': jobs.list_jobs()
+    })
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    try:
+        return jsonify({
+            'success': True,
+            'result': jobs.get(job_id).info()
+        })
+    except KeyError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    try:
+        return jsonify({
+            'success': True,
+            'result': jobs.cancel(job_id).info()
+        })
+    except KeyError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Result of a completed job; 409 while it is still running"""
+    try:
+        job = jobs.get(job_id)
+    except KeyError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    if job.status != COMPLETED:
+        return jsonify({'success': False, 'error': f'Job is {job.status}', 'result': job.info()}), 409
+    result = job.result
+    if isinstance(result, dict) and job.kind == 'sweep':
+        result = {name: values.tolist() for name, values in result.items()}
+    return jsonify({
+        'success': True,
+        'result': result
+    })
+
+@app.route('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    """Stream a job's result rows as NDJSON while its tasks complete"""
+    try:
+        jobs.get(job_id)
+    except KeyError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    
+    def generate():
+        for row in jobs.stream(job_id):
+            yield json.dumps(row, separators=(',', ':')) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/models')
 def get_models():
-    models = list(calculator.model_specs.keys())
+    # ?details=true adds parameter counts and the weight size per precision
+    if request.args.get('details', '').lower() not in ('1', 'true', 'yes'):
+        models = list(calculator.model_specs.keys())
+        return jsonify(models)
+    
+    models = [{
+        'model_size': name,
+        'parameters_billions': spec.parameters_billions,
+        'weight_memory_gb': {
+            precision: calculator.weight_memory_gb(name, precision) for precision in PRECISION_BYTES
+        }
+    } for name, spec in calculator.model_specs.items()]
     return jsonify(models)
 
 @app.route('/api/hardware')
@@ -53,9 +497,36 @@ def get_hardware():
     hardware = list(calculator.hardware_specs.keys())
     return jsonify(hardware)
 
+@app.route('/api/catalog')
+def get_catalog():
+    catalog = calculator.catalog
+    return jsonify({
+        'version': catalog.version,
+        'hardware': list(catalog.hardware_specs.keys()),
+        'models': list(catalog.model_specs.keys()),
+        'reload_error': calculator.catalog_error
+    })
+
 @app.route('/api/deployment_modes')
 def get_deployment_modes():
-    modes = ['local', 'cloud', 'edge']
+    modes = list(DEPLOYMENT_FACTORS)
+    return jsonify(modes)
+
+@app.route('/api/precisions')
+def get_precisions():
+    return jsonify({
+        'weights': list(PRECISION_BYTES.keys()),
+        'kv_cache': KV_CACHE_PRECISIONS
+    })
+
+@app.route('/api/latency_modes')
+def get_latency_modes():
+    modes = ['empirical', 'roofline']
+    return jsonify(modes)
+
+@app.route('/api/cost_modes')
+def get_cost_modes():
+    modes = ['per_request', 'throughput']
     return jsonify(modes)
 
 if __name__ == '__main__':
@@ -0,0 +1,265 @@
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from inference_calculator import LLMInferenceCalculator
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_PATH = os.path.join(BENCHMARK_DIR, 'benchmark_golden.json')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'benchmark_baseline.json')
+
+# Allowed throughput drop against the baseline before the run fails
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+# Relative tolerance when comparing golden outputs
+GOLDEN_REL_TOL = 1e-9
+
+# Scenarios pinned by the golden outputs, covering each latency and cost
+# model, quantization and the serving optimizations
+GOLDEN_SCENARIOS = [
+    {'model_size': '7B', 'tokens': 1024, 'batch_size': 1, 'hardware_type': 'RTX4090',
+     'deployment_mode': 'local', 'requests_per_hour': 10},
+    {'model_size': '13B', 'tokens': 2048, 'batch_size': 4, 'hardware_type': 'A100',
+     'deployment_mode': 'cloud', 'requests_per_hour': 100},
+    {'model_size': 'GPT-4', 'tokens': 4096, 'batch_size': 1, 'hardware_type': 'H100',
+     'deployment_mode': 'cloud', 'requests_per_hour': 50},
+    {'model_size': '7B', 'tokens': 512, 'batch_size': 16, 'hardware_type': 'A100',
+     'deployment_mode': 'cloud', 'requests_per_hour': 10000, 'latency_mode': 'roofline',
+     'prompt_tokens': 1024},
+    {'model_size': '70B', 'tokens': 256, 'batch_size': 8, 'hardware_type': 'H100',
+     'deployment_mode': 'cloud', 'requests_per_hour': 1000, 'latency_mode': 'roofline',
+     'prompt_tokens': 2048, 'precision': 'int4', 'kv_precision': 'fp8'},
+    {'model_size': '13B', 'tokens': 512, 'batch_size': 1, 'hardware_type': 'L40S',
+     'deployment_mode': 'edge', 'requests_per_hour': 100, 'precision': 'awq'},
+    {'model_size': '70B', 'tokens': 512, 'batch_size': 4, 'hardware_type': 'H100',
+     'deployment_mode': 'cloud', 'requests_per_hour': 100, 'latency_mode': 'roofline',
+     'prompt_tokens': 1024, 'draft_model': '7B', 'shared_prefix_tokens': 512,
+     'prefix_cache_hit_rate': 0.8},
+    {'model_size': '7B', 'tokens': 512, 'batch_size': 16, 'hardware_type': 'A100',
+     'deployment_mode': 'cloud', 'requests_per_hour': 100000, 'latency_mode': 'roofline',
+     'prompt_tokens': 512, 'cost_mode': 'throughput'},
+]
+
+# Grid used for the sweep golden rows and the sweep throughput benchmark
+SWEEP_GRID = {
+    'model_sizes': ['7B', '13B', '70B', 'GPT-4'],
+    'tokens': list(range(128, 8192, 128)),
+    'batch_sizes': list(range(1, 65)),
+    'hardware_types': ['V100', 'A100', 'H100', 'RTX4090', 'CPU', 'L40S'],
+    'deployment_modes': ['local', 'cloud', 'edge'],
+    'requests_per_hour': [100, 1000, 10000],
+    'precisions': ['fp16', 'int8', 'int4'],
+}
+
+# Sweep rows pinned by the golden outputs
+SWEEP_GOLDEN_ROWS = [0, 1, 4097, 123456, 654321, -1]
+
+
+def golden_outputs(calculator: LLMInferenceCalculator) -> Dict[str, any]:
+    """Outputs pinned by the golden file"""
+    sweep = calculator.calculate_sweep(**SWEEP_GRID)
+    return {
+        'catalog_version': calculator.catalog.version,
+        'scenarios': [calculator.calculate_inference_metrics(**scenario) for scenario in GOLDEN_SCENARIOS],
+        'sweep_rows': {
+            str(row): {name: values[row].item() for name, values in sweep.items()}
+            for row in SWEEP_GOLDEN_ROWS
+        }
+    }
+
+
+def compare_golden(expected, actual, path: str = '', rel_tol: float = GOLDEN_REL_TOL) -> List[str]:
+    """Differences between two nested outputs, one message per differing leaf"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in sorted(set(expected) | set(actual)):
+            child = f'{path}.{key}' if path else str(key)
+            if key not in actual:
+                diffs.append(f'{child}: missing')
+            elif key not in expected:
+                diffs.append(f'{child}: unexpected new output')
+            else:
+                diffs.extend(compare_golden(expected[key], actual[key], child, rel_tol))
+        return diffs
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f'{path}: length {len(actual)} != {len(expected)}']
+        diffs = []
+        for index, (e, a) in enumerate(zip(expected, actual)):
+            diffs.extend(compare_golden(e, a, f'{path}[{index}]', rel_tol))
+        return diffs
+    if (isinstance(expected, (int, float)) and isinstance(actual, (int, float))
+            and not isinstance(expected, bool) and not isinstance(actual, bool)):
+        if math.isclose(expected, actual, rel_tol=rel_tol, abs_tol=1e-12):
+            return []
+    elif expected == actual:
+        return []
+    return [f'{path}: {actual!r} != {expected!r}']
+
+
+def check_job_cancellation(timeout: float = 60) -> List[str]:
+    """Cancel a background job that still has queued tasks; problems found, if any
+
+    Guards against the job manager deadlocking when Future.cancel() runs
+    its done callbacks.
+    """
+    from jobs import BATCH_CHUNK_SCENARIOS, CANCELLED, JobManager
+    manager = JobManager(max_workers=1)
+    try:
+        # One worker and several chunks, so all but the first task are still queued
+        scenarios = [dict(GOLDEN_SCENARIOS[0], tokens=128 + i) for i in range(BATCH_CHUNK_SCENARIOS * 4)]
+        job = manager.submit_batch(scenarios)
+        cancel = threading.Thread(target=manager.cancel, args=(job.id,), daemon=True)
+        cancel.start()
+        cancel.join(timeout)
+        if cancel.is_alive():
+            return [f'cancelling a job with queued tasks did not return within {timeout:.0f}s']
+        lister = threading.Thread(target=manager.list_jobs, daemon=True)
+        lister.start()
+        lister.join(timeout)
+        if lister.is_alive():
+            return ['the job manager stayed locked after a cancel']
+        status = manager.get(job.id).status
+        if status != CANCELLED:
+            return [f'cancelled job has status {status!r}']
+        return []
+    finally:
+        manager.shutdown()
+
+
+def _best_of(function, repeats: int) -> float:
+    """Fastest of several timed runs, in seconds"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_benchmarks(repeats: int = 5) -> Dict[str, float]:
+    """Throughput benchmarks; higher is better for every metric"""
+    results = {}
+
+    # Per-scenario latency of calculate_inference_metrics, uncached
+    calculator = LLMInferenceCalculator(cache_size=0)
+    per_call = []
+    for scenario in GOLDEN_SCENARIOS:
+        per_call.append(_best_of(lambda: [calculator.calculate_inference_metrics(**scenario)
+                                          for _ in range(200)], repeats) / 200)
+    results['metrics_calls_per_second'] = 1 / statistics.median(per_call)
+
+    # Cached lookups of the same scenarios
+    cached = LLMInferenceCalculator()
+    results['cached_metrics_calls_per_second'] = len(GOLDEN_SCENARIOS) * 200 / _best_of(
+        lambda: [cached.calculate_inference_metrics(**scenario)
+                 for _ in range(200) for scenario in GOLDEN_SCENARIOS], repeats)
+
+    # Vectorized sweep rows per second
+    rows = math.prod(len(axis) for axis in SWEEP_GRID.values())
+    results['sweep_rows_per_second'] = rows / _best_of(lambda: calculator.calculate_sweep(**SWEEP_GRID),
+                                                       max(1, repeats // 2))
+
+    # /calculate through the Flask test client (uncached, so the handler does real work)
+    from app import app, calculator as app_calculator
+    client = app.test_client()
+    requests = 200
+    payloads = [dict(GOLDEN_SCENARIOS[i % len(GOLDEN_SCENARIOS)], tokens=128 + i) for i in range(requests)]
+
+    def post_all():
+        app_calculator.clear_cache()
+        for payload in payloads:
+            response = client.post('/calculate', json=payload)
+            if response.status_code != 200:
+                raise RuntimeError(f'/calculate failed: {response.get_json()}')
+
+    results['calculate_requests_per_second'] = requests / _best_of(post_all, repeats)
+    return results
+
+
+def check_regressions(baseline: Dict[str, float], current: Dict[str, float],
+    threshold: float) -> List[str]:
+    """Metrics whose throughput dropped by more than threshold"""
+    failures = []
+    for name, base in baseline.items():
+        if name in current and current[name] < base * (1 - threshold):
+            failures.append(f'{name}: {current[name]:.1f} is {(1 - current[name] / base) * 100:.1f}% '
+                            f'below the baseline {base:.1f}')
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the golden checks and benchmarks; returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Golden-output checks and throughput benchmarks")
+    parser.add_argument('--update-golden', action='store_true',
+                        help='rewrite the golden outputs after an intentional model change')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store this run as the throughput baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help='allowed fractional throughput drop (default 0.2)')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--golden-only', action='store_true', help='skip the throughput benchmarks')
+    parser.add_argument('--golden', default=GOLDEN_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+    failed = False
+
+    # Golden outputs round-trip through JSON so both sides have the same types,
+    # and pin the tracked catalog, so a host's calibration overlay is left out
+    outputs = json.loads(json.dumps(golden_outputs(LLMInferenceCalculator(include_local_catalog=False))))
+    if args.update_golden or not os.path.exists(args.golden):
+        with open(args.golden, 'w', encoding='utf-8') as f:
+            json.dump(outputs, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Wrote golden outputs to {args.golden}')
+    else:
+        with open(args.golden, 'r', encoding='utf-8') as f:
+            diffs = compare_golden(json.load(f), outputs)
+        if diffs:
+            failed = True
+            print(f'Golden outputs changed ({len(diffs)} values); rerun with --update-golden if intended:')
+            for diff in diffs[:20]:
+                print(f'  {diff}')
+        else:
+            print('Golden outputs match')
+
+    failures = check_job_cancellation()
+    if failures:
+        failed = True
+        print('Job checks failed:')
+        for failure in failures:
+            print(f'  {failure}')
+    else:
+        print('Job cancellation works')
+
+    if not args.golden_only:
+        current = run_benchmarks(args.repeats)
+        print(json.dumps(current, indent=2))
+        if args.update_baseline or not os.path.exists(args.baseline):
+            with open(args.baseline, 'w', encoding='utf-8') as f:
+                json.dump(current, f, indent=2, sort_keys=True)
+                f.write('\n')
+            print(f'Wrote baseline to {args.baseline}')
+        else:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                failures = check_regressions(json.load(f), current, args.threshold)
+            if failures:
+                failed = True
+                print('Throughput regressions:')
+                for failure in failures:
+                    print(f'  {failure}')
+            else:
+                print(f'No throughput regression beyond {args.threshold:.0%}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from catalog import (
+    DEFAULT_CATALOG_PATH,
+    HardwareSpecs,
+    local_overlay_path,
+    merge_catalog_data,
+    parse_catalog,
+    read_catalog_data,
+)
+
+
+# Catalog entries with trusted latency_efficiency values, used to map a
+# measured memory bandwidth onto the empirical latency scale
+REFERENCE_HARDWARE = ["RTX4090", "V100", "A100", "H100"]
+
+# Working-set size of the memory bandwidth benchmark (well beyond any LLC)
+COPY_BUFFER_MB = 256
+
+# Matrix size of the GEMM throughput benchmark
+GEMM_SIZE = 1024
+
+
+def measure_memory_bandwidth(max_seconds: float = 1.0, buffer_mb: int = COPY_BUFFER_MB) -> float:
+    """Best-of copy bandwidth in GB/s (a copy reads and writes every byte)"""
+    src = np.ones(buffer_mb * 1024**2 // 8, dtype=np.float64)
+    dst = np.empty_like(src)
+    np.copyto(dst, src)  # fault in the pages before timing
+    return _best_rate(lambda: np.copyto(dst, src), 2 * src.nbytes, max_seconds) / 1e9
+
+
+def measure_gemm_throughput(max_seconds: float = 1.0, size: int = GEMM_SIZE) -> float:
+    """Best-of float32 matrix multiply throughput in TFLOPS"""
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal((size, size), dtype=np.float32)
+    b = rng.standard_normal((size, size), dtype=np.float32)
+    out = np.empty((size, size), dtype=np.float32)
+    np.matmul(a, b, out=out)  # warm up the BLAS thread pool
+    return _best_rate(lambda: np.matmul(a, b, out=out), 2 * size**3, max_seconds) / 1e12
+
+
+def _best_rate(operation, work: float, max_seconds: float, min_runs: int = 3) -> float:
+    """Run an operation repeatedly within a time budget and return the best work per second"""
+    best_s = float("inf")
+    deadline = time.perf_counter() + max_seconds
+    runs = 0
+    while runs < min_runs or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        operation()
+        best_s = min(best_s, time.perf_counter() - start)
+        runs += 1
+    return work / max(best_s, 1e-12)
+
+
+def usable_cores() -> int:
+    """CPU cores this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def total_memory_gb() -> float:
+    """Physical memory of the host in GB"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) / 1024**2
+    except OSError:
+        pass
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**3
+
+
+def fit_latency_efficiency(catalog_data: dict, memory_bandwidth_gbps: float) -> float:
+    """Empirical latency_efficiency for a host with the given memory bandwidth
+
+    Decoding is memory-bound, so the catalog's latency factors for the
+    REFERENCE_HARDWARE entries are fitted as a power law of memory
+    bandwidth and evaluated at the measured bandwidth.
+    """
+    points = [(entry["memory_bandwidth_gbps"], entry["latency_efficiency"])
+              for name, entry in catalog_data["hardware"].items() if name in REFERENCE_HARDWARE]
+    if len(points) < 2:
+        raise ValueError("Catalog needs at least two reference hardware entries to fit latency_efficiency")
+    bandwidth, efficiency = np.log(np.array(points)).T
+    slope, intercept = np.polyfit(bandwidth, efficiency, 1)
+    return float(np.exp(intercept + slope * np.log(memory_bandwidth_gbps)))
+
+
+def calibrate_host(catalog_data: dict, name: str = "CPU", max_seconds: float = 1.0,
+    cost_per_hour: Optional[float] = None, power_consumption_w: Optional[float] = None) -> Dict[str, any]:
+    """Benchmark the local host and build a catalog hardware entry for it
+
+    Cost, power and interconnect cannot be measured, so they are taken from
+    the arguments or from the existing entry of the same name (falling back
+    to the catalog's CPU entry).
+    """
+    hardware = catalog_data["hardware"]
+    previous = hardware.get(name) or hardware.get("CPU", {})
+
+    memory_bandwidth_gbps = measure_memory_bandwidth(max_seconds)
+    compute_tflops = measure_gemm_throughput(max_seconds)
+    cores = usable_cores()
+
+    entry = {
+        "name": f"{platform.processor() or platform.machine()} ({cores} cores, calibrated)",
+        "vram_gb": round(total_memory_gb(), 2),
+        "memory_bandwidth_gbps": round(memory_bandwidth_gbps, 2),
+        "compute_tflops": round(compute_tflops, 4),
+        "cost_per_hour": cost_per_hour if cost_per_hour is not None else previous.get("cost_per_hour", 0.1),
+        "power_consumption_w": (power_consumption_w if power_consumption_w is not None
+                                else previous.get("power_consumption_w", 150.0)),
+        "interconnect_bandwidth_gbps": previous.get("interconnect_bandwidth_gbps", 12.5),
+        "latency_efficiency": round(fit_latency_efficiency(catalog_data, memory_bandwidth_gbps), 3),
+        "calibration": {
+            "host": platform.node(),
+            "cores": cores,
+            "measured_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "copy_buffer_mb": COPY_BUFFER_MB,
+            "gemm_size": GEMM_SIZE,
+            "gemm_dtype": "float32"
+        }
+    }
+    return entry
+
+
+def write_profile(catalog_path: str, name: str, entry: dict) -> HardwareSpecs:
+    """Add or replace a hardware entry in the local overlay of a catalog
+
+    The tracked catalog file is never modified; profiles go to its untracked
+    overlay (local_overlay_path), which load_catalog merges in. The merged
+    catalog is validated before the overlay is written, and the overlay is
+    replaced atomically so a running app never reloads a partial file.
+    """
+    overlay_path = local_overlay_path(catalog_path)
+    overlay = {}
+    if os.path.exists(overlay_path):
+        with open(overlay_path, "r", encoding="utf-8") as f:
+            overlay = json.load(f)
+    overlay.setdefault("hardware", {})[name] = entry
+    with open(catalog_path, "r", encoding="utf-8") as f:
+        catalog = parse_catalog(merge_catalog_data(json.load(f), overlay))
+
+    directory = os.path.dirname(os.path.abspath(overlay_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(overlay, f, indent=2)
+            f.write("\n")
+        os.replace(tmp_path, overlay_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return catalog.hardware_specs[name]
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point for host calibration"""
+    parser = argparse.ArgumentParser(description="Measure the local host and write a hardware profile")
+    parser.add_argument("--name", default="CPU", help="hardware type to add or replace in the local overlay")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_PATH)
+    parser.add_argument("--max-seconds", type=float, default=1.0, help="time budget per benchmark")
+    parser.add_argument("--cost-per-hour", type=float, default=None)
+    parser.add_argument("--power-w", type=float, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="print the profile without writing it")
+    args = parser.parse_args(argv)
+
+    catalog_data = read_catalog_data(args.catalog)
+    entry = calibrate_host(catalog_data, args.name, args.max_seconds, args.cost_per_hour, args.power_w)
+    print(json.dumps({args.name: entry}, indent=2))
+    if not args.dry_run:
+        write_profile(args.catalog, args.name, entry)
+        print(f"Wrote hardware profile '{args.name}' to {local_overlay_path(args.catalog)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import json
+import math
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from inference_calculator import (
+    LLMInferenceCalculator,
+    LatencyMode,
+    POWER_COST_PER_KWH,
+)
+
+
+# Batch sizes searched when none are given
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128]
+
+# Percentile of the token distribution used for latency and memory sizing
+SIZING_PERCENTILE = 95
+
+
+class CapacityPlanner:
+    """Search for the cheapest fleet that serves a workload within a latency SLO
+
+    Every (hardware type, deployment mode, precision, batch size) candidate is
+    sized with the calculator: the parallelism planner gives the GPUs per
+    replica, the roofline model gives the request latency (time to first
+    token plus decode), and the number of replicas follows from the
+    per-replica request rate. Candidates that do not fit in memory, miss
+    the SLO or need more than max_gpus are pruned; since latency and memory
+    grow with batch size, the batch-size loop stops at the first batch that
+    misses the SLO or does not fit.
+    """
+
+    def __init__(self, calculator: Optional[LLMInferenceCalculator] = None):
+        self.calculator = calculator or LLMInferenceCalculator()
+
+    def evaluate_candidate(self, model_size: str, hardware_type: str, deployment_mode: str,
+        batch_size: int, requests_per_hour: float, prompt_tokens: int, output_tokens: int,
+        mean_output_tokens: float, precision: str = "fp16") -> Dict[str, any]:
+        """Size a fleet for one configuration"""
+        calculator = self.calculator
+        hardware = calculator.hardware_specs[hardware_type]
+        total_tokens = prompt_tokens + output_tokens
+
+        plan = calculator.plan_parallelism(model_size, total_tokens, batch_size, hardware_type,
+                                           deployment_mode, precision=precision)
+        latency = calculator.calculate_latency(model_size, output_tokens, batch_size, hardware_type,
+                                               deployment_mode, latency_mode=LatencyMode.ROOFLINE.value,
+                                               prompt_tokens=prompt_tokens, precision=precision)
+
+        # Sharded replicas split prefill across the TP group and pay comms on decode
+        time_to_first_token_ms = latency["time_to_first_token_ms"] / plan["tensor_parallel"]
+        latency_ms = time_to_first_token_ms + plan["inter_token_latency_ms"] * max(output_tokens - 1, 0)
+        mean_latency_ms = (time_to_first_token_ms
+                           + plan["inter_token_latency_ms"] * max(mean_output_tokens - 1, 0))
+
+        replica_requests_per_hour = batch_size / (mean_latency_ms / 1000) * 3600
+        replicas = max(1, math.ceil(requests_per_hour / replica_requests_per_hour))
+        gpus = replicas * plan["gpus_per_replica"]
+        gpu_cost_per_hour = hardware.cost_per_hour + (hardware.power_consumption_w / 1000) * POWER_COST_PER_KWH
+
+        return {
+            "hardware_type": hardware_type,
+            "deployment_mode": deployment_mode,
+            "precision": precision,
+            "batch_size": batch_size,
+            "fits": plan["fits"],
+            "tensor_parallel": plan["tensor_parallel"],
+            "pipeline_parallel": plan["pipeline_parallel"],
+            "gpus_per_replica": plan["gpus_per_replica"],
+            "replicas": replicas,
+            "total_gpus": gpus,
+            "latency_ms": latency_ms,
+            "time_to_first_token_ms": time_to_first_token_ms,
+            "memory_headroom_percent": (1 - plan["memory_per_gpu_gb"] / hardware.vram_gb) * 100,
+            "replica_requests_per_hour": replica_requests_per_hour,
+            "utilization_percent": requests_per_hour / (replicas * replica_requests_per_hour) * 100,
+            "cost_per_hour": gpus * gpu_cost_per_hour,
+            "monthly_cost": gpus * gpu_cost_per_hour * 24 * 30
+        }
+
+    def plan(self, model_size: str, requests_per_hour: float,
+        prompt_tokens: Union[int, Sequence[int]] = 512,
+        output_tokens: Union[int, Sequence[int]] = 256,
+        latency_slo_ms: float = 5000.0,
+        hardware_types: Optional[List[str]] = None,
+        deployment_modes: Optional[List[str]] = None,
+        batch_sizes: Optional[List[int]] = None,
+        precisions: Optional[List[str]] = None,
+        max_gpus: int = 1024) -> Dict[str, any]:
+        """Find the cheapest feasible fleet and the cost/latency/headroom Pareto frontier
+
+        prompt_tokens/output_tokens are a fixed length or a list of observed
+        lengths; the SIZING_PERCENTILE length is used for latency and memory
+        and the mean length for throughput.
+        """
+        calculator = self.calculator
+        hardware_types = hardware_types or list(calculator.hardware_specs.keys())
+        deployment_modes = deployment_modes or ["local", "cloud", "edge"]
+        batch_sizes = sorted(batch_sizes or DEFAULT_BATCH_SIZES)
+        precisions = precisions or ["fp16"]
+
+        prompt_arr = np.atleast_1d(np.asarray(prompt_tokens, dtype=np.int64))
+        output_arr = np.atleast_1d(np.asarray(output_tokens, dtype=np.int64))
+        sizing_prompt = int(math.ceil(np.percentile(prompt_arr, SIZING_PERCENTILE)))
+        sizing_output = int(math.ceil(np.percentile(output_arr, SIZING_PERCENTILE)))
+        mean_output = float(output_arr.mean())
+
+        feasible = []
+        evaluated = 0
+        pruned = 0
+        for hardware_type in hardware_types:
+            for deployment_mode in deployment_modes:
+                for precision in precisions:
+                    for position, batch_size in enumerate(batch_sizes):
+                        evaluated += 1
+                        candidate = self.evaluate_candidate(
+                            model_size, hardware_type, deployment_mode, batch_size, requests_per_hour,
+                            sizing_prompt, sizing_output, mean_output, precision)
+                        if not candidate["fits"] or candidate["latency_ms"] > latency_slo_ms:
+                            # Larger batches only use more memory and take longer
+                            pruned += len(batch_sizes) - position
+                            break
+                        if candidate["total_gpus"] > max_gpus:
+                            pruned += 1
+                            continue
+                        feasible.append(candidate)
+
+        frontier = pareto_frontier(feasible)
+        return {
+            "inputs": {
+                "model_size": model_size,
+                "requests_per_hour": requests_per_hour,
+                "sizing_prompt_tokens": sizing_prompt,
+                "sizing_output_tokens": sizing_output,
+                "latency_slo_ms": latency_slo_ms,
+                "max_gpus": max_gpus
+            },
+            "cheapest": frontier[0] if frontier else None,
+            "pareto_frontier": frontier,
+            "candidates_evaluated": evaluated,
+            "candidates_pruned": pruned,
+            "candidates_feasible": len(feasible)
+        }
+
+
+def pareto_frontier(candidates: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    """Candidates not dominated on (cost, latency, memory headroom), cheapest first
+
+    A candidate is dominated if another is no worse on all three objectives
+    (lower cost, lower latency, higher headroom) and strictly better on one.
+    """
+    ordered = sorted(candidates, key=lambda c: (c["cost_per_hour"], c["latency_ms"],
+                                                -c["memory_headroom_percent"]))
+    frontier = []
+    for candidate in ordered:
+        dominated = any(
+            kept["cost_per_hour"] <= candidate["cost_per_hour"]
+            and kept["latency_ms"] <= candidate["latency_ms"]
+            and kept["memory_headroom_percent"] >= candidate["memory_headroom_percent"]
+            for kept in frontier
+        )
+        if not dominated:
+            frontier.append(candidate)
+    return frontier
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point for the capacity planner"""
+    parser = argparse.ArgumentParser(description="Find the cheapest fleet that meets a latency SLO")
+    parser.add_argument("--model-size", default="7B")
+    parser.add_argument("--requests-per-hour", type=float, default=1000)
+    parser.add_argument("--prompt-tokens", type=int, nargs="+", default=[512])
+    parser.add_argument("--output-tokens", type=int, nargs="+", default=[256])
+    parser.add_argument("--latency-slo-ms", type=float, default=5000)
+    parser.add_argument("--hardware", nargs="+", default=None)
+    parser.add_argument("--deployment-modes", nargs="+", default=None)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--precisions", nargs="+", default=None)
+    parser.add_argument("--max-gpus", type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    planner = CapacityPlanner()
+    result = planner.plan(
+        model_size=args.model_size,
+        requests_per_hour=args.requests_per_hour,
+        prompt_tokens=args.prompt_tokens,
+        output_tokens=args.output_tokens,
+        latency_slo_ms=args.latency_slo_ms,
+        hardware_types=args.hardware,
+        deployment_modes=args.deployment_modes,
+        batch_sizes=args.batch_sizes,
+        precisions=args.precisions,
+        max_gpus=args.max_gpus
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import json
+import os
+from dataclasses import MISSING, dataclass, fields
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Catalog shipped next to this module
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'catalog.json')
+
+
+@dataclass
+class HardwareSpecs:
+    """Hardware specifications"""
+    name: str
+    vram_gb: float
+    memory_bandwidth_gbps: float
+    compute_tflops: float
+    cost_per_hour: float
+    power_consumption_w: float
+    interconnect_bandwidth_gbps: float  # GPU-to-GPU (NVLink/PCIe/network)
+
+
+@dataclass
+class ModelSpecs:
+    """Model specifications"""
+    name: str
+    parameters_billions: float
+    model_size_gb: float
+    context_window: int
+    tokens_per_second: float
+    memory_efficiency: float
+    num_layers: int
+    num_kv_heads: int
+    head_dim: int
+    hidden_size: int
+    kv_dtype_bytes: float = 2.0
+
+
+class CatalogError(ValueError):
+    """Raised when a catalog file is missing fields or has invalid values"""
+
+
+class Catalog:
+    """Validated, indexed hardware and model catalog
+
+    Besides the spec dicts keyed by name, every numeric field is also stored
+    as a NumPy column (hardware_columns / model_columns) ordered by
+    hardware_index / model_index, so vectorized code can gather values for
+    many scenarios with one fancy-indexing operation.
+    """
+
+    def __init__(self, version: str, hardware_specs: Dict[str, HardwareSpecs],
+        model_specs: Dict[str, ModelSpecs], hardware_latency_efficiency: Dict[str, float],
+        model_base_latency_ms: Dict[str, float], path: str = None, mtime: float = None):
+        self.version = version
+        self.hardware_specs = hardware_specs
+        self.model_specs = model_specs
+        self.hardware_latency_efficiency = hardware_latency_efficiency
+        self.model_base_latency_ms = model_base_latency_ms
+        self.path = path
+        self.mtime = mtime
+
+        self.hardware_index = {name: i for i, name in enumerate(hardware_specs)}
+        self.model_index = {name: i for i, name in enumerate(model_specs)}
+        self.hardware_columns = _columns(list(hardware_specs.values()), HardwareSpecs)
+        self.hardware_columns["latency_efficiency"] = np.array(
+            [hardware_latency_efficiency[name] for name in hardware_specs])
+        self.model_columns = _columns(list(model_specs.values()), ModelSpecs)
+        self.model_columns["base_latency_per_token_ms"] = np.array(
+            [model_base_latency_ms[name] for name in model_specs])
+
+
+def load_catalog(path: str = DEFAULT_CATALOG_PATH, include_local: bool = True) -> Catalog:
+    """Load and validate a catalog file, merged with its local overlay if present"""
+    mtime = catalog_mtime(path, include_local)
+    data = read_catalog_data(path, include_local)
+    return parse_catalog(data, path=path, mtime=mtime)
+
+
+def local_overlay_path(path: str) -> str:
+    """Untracked, host-local overlay of a catalog file: catalog.json -> catalog.local.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.local{ext}"
+
+
+def catalog_mtime(path: str, include_local: bool = True) -> Tuple[float, Optional[float]]:
+    """Modification times of a catalog file and of its local overlay (None when absent)"""
+    overlay_mtime = None
+    if include_local:
+        try:
+            overlay_mtime = os.path.getmtime(local_overlay_path(path))
+        except OSError:
+            pass
+    return os.path.getmtime(path), overlay_mtime
+
+
+def read_catalog_data(path: str, include_local: bool = True) -> dict:
+    """Raw catalog data, with the entries of the local overlay (if any) merged in"""
+    data = _read_json(path)
+    overlay_path = local_overlay_path(path)
+    if include_local and os.path.exists(overlay_path):
+        data = merge_catalog_data(data, _read_json(overlay_path))
+    return data
+
+
+def merge_catalog_data(data: dict, overlay: dict) -> dict:
+    """Catalog data with the hardware and model entries of an overlay added or replaced
+
+    The version gains a '+local' suffix, so results computed with an overlay
+    are never mistaken for results of the tracked catalog.
+    """
+    if not isinstance(data, dict) or not isinstance(overlay, dict):
+        raise CatalogError("Catalog and overlay must be JSON objects")
+    merged = dict(data)
+    for section in ('hardware', 'models'):
+        entries = overlay.get(section, {})
+        if not isinstance(entries, dict):
+            raise CatalogError(f"Overlay '{section}' must be an object")
+        if entries:
+            merged[section] = {**data.get(section, {}), **entries}
+    merged['version'] = f"{data.get('version')}+local"
+    return merged
+
+
+def _read_json(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError as e:
+            raise CatalogError(f"{path}: invalid JSON: {e}")
+
+
+def parse_catalog(data: dict, path: str = None, mtime: float = None) -> Catalog:
+    """Validate catalog data and build a Catalog"""
+    if not isinstance(data, dict):
+        raise CatalogError("Catalog must be a JSON object")
+    for section in ('version', 'hardware', 'models'):
+        if section not in data:
+            raise CatalogError(f"Catalog is missing '{section}'")
+    if not data['hardware'] or not data['models']:
+        raise CatalogError("Catalog must define at least one hardware type and one model")
+
+    hardware_specs = {}
+    hardware_latency_efficiency = {}
+    for name, entry in data['hardware'].items():
+        hardware_specs[name] = _build_spec(HardwareSpecs, f"hardware '{name}'", entry)
+        hardware_latency_efficiency[name] = _positive_number(entry, 'latency_efficiency', f"hardware '{name}'")
+
+    model_specs = {}
+    model_base_latency_ms = {}
+    for name, entry in data['models'].items():
+        model_specs[name] = _build_spec(ModelSpecs, f"model '{name}'", entry)
+        model_base_latency_ms[name] = _positive_number(entry, 'base_latency_per_token_ms', f"model '{name}'")
+
+    return Catalog(str(data['version']), hardware_specs, model_specs, hardware_latency_efficiency,
+                   model_base_latency_ms, path=path, mtime=mtime)
+
+
+def _build_spec(spec_class, label: str, entry: dict):
+    """Build a spec dataclass from a catalog entry, checking every field"""
+    if not isinstance(entry, dict):
+        raise CatalogError(f"{label} must be an object")
+    values = {}
+    for field in fields(spec_class):
+        if field.name not in entry:
+            if field.default is not MISSING:
+                continue
+            raise CatalogError(f"{label} is missing '{field.name}'")
+        if field.type is str:
+            if not isinstance(entry[field.name], str):
+                raise CatalogError(f"{label}: '{field.name}' must be a string")
+            values[field.name] = entry[field.name]
+        else:
+            value = _positive_number(entry, field.name, label)
+            values[field.name] = int(value) if field.type is int else float(value)
+    return spec_class(**values)
+
+
+def _positive_number(entry: dict, key: str, label: str) -> float:
+    """Read a required positive number from a catalog entry"""
+    value = entry.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise CatalogError(f"{label}: '{key}' must be a number")
+    if value <= 0:
+        raise CatalogError(f"{label}: '{key}' must be positive")
+    return value
+
+
+def _columns(specs: List, spec_class) -> Dict[str, np.ndarray]:
+    """Numeric fields of a list of specs as NumPy columns"""
+    return {
+        field.name: np.array([getattr(spec, field.name) for spec in specs], dtype=np.float64)
+        for field in fields(spec_class) if field.type is not str
+    }
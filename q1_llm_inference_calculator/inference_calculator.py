@@ -1,9 +1,26 @@
 import math
 import json
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+import threading
+import time
+import os
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, List, Tuple, Optional, Iterable, Union
 from enum import Enum
 
+import numpy as np
+
+from catalog import (
+    DEFAULT_CATALOG_PATH,
+    Catalog,
+    CatalogError,
+    HardwareSpecs,
+    ModelSpecs,
+    catalog_mtime,
+    load_catalog,
+)
+from kv_cache import DEFAULT_BLOCK_SIZE, kv_cache_bytes_per_token, simulate_paged_allocation
+
 
 class ModelSize(Enum):
     """Supported model sizes"""
@@ -28,126 +45,231 @@ class DeploymentMode(Enum):
     EDGE = "edge"
 
 
-@dataclass
-class HardwareSpecs:
-    """Hardware specifications"""
-    name: str
-    vram_gb: float
-    memory_bandwidth_gbps: float
-    compute_tflops: float
-    cost_per_hour: float
-    power_consumption_w: float
+class Precision(Enum):
+    """Weight and KV cache number formats"""
+    FP16 = "fp16"
+    FP8 = "fp8"
+    INT8 = "int8"
+    INT4 = "int4"
+    GPTQ = "gptq"  # 4-bit weights with group-wise scales
+    AWQ = "awq"    # 4-bit activation-aware weights with group-wise scales
+
+
+class LatencyMode(Enum):
+    """Latency models"""
+    EMPIRICAL = "empirical"  # Per-model ms/token tables
+    ROOFLINE = "roofline"    # Prefill/decode from TFLOPS and memory bandwidth
+
+
+class CostMode(Enum):
+    """Cost models"""
+    PER_REQUEST = "per_request"  # Each request occupies a whole GPU for its latency
+    THROUGHPUT = "throughput"    # Batched replicas sized for the request rate
+
+
+# Deployment mode factors
+DEPLOYMENT_FACTORS = {
+    DeploymentMode.LOCAL.value: 1.0,
+    DeploymentMode.CLOUD.value: 1.1,  # Slight network overhead
+    DeploymentMode.EDGE.value: 1.3    # Limited resources
+}
+
+# Bytes per value for each precision; GPTQ/AWQ carry an FP16 scale and zero
+# point per group of 128 weights (~4.25 bits)
+PRECISION_BYTES = {
+    Precision.FP16.value: 2.0,
+    Precision.FP8.value: 1.0,
+    Precision.INT8.value: 1.0,
+    Precision.INT4.value: 0.5,
+    Precision.GPTQ.value: 0.53,
+    Precision.AWQ.value: 0.53
+}
+
+# Dequantization overhead on weight reads (quantized kernels fall short of
+# the ideal bandwidth saving)
+DEQUANTIZATION_OVERHEAD = {
+    Precision.FP16.value: 1.0,
+    Precision.FP8.value: 1.0,
+    Precision.INT8.value: 1.1,
+    Precision.INT4.value: 1.2,
+    Precision.GPTQ.value: 1.2,
+    Precision.AWQ.value: 1.15
+}
+
+# Formats supported for the KV cache
+KV_CACHE_PRECISIONS = [Precision.FP16.value, Precision.FP8.value, Precision.INT8.value]
+
+# Fraction of peak TFLOPS / memory bandwidth reached in practice (roofline mode)
+ROOFLINE_COMPUTE_EFFICIENCY = 0.5
+ROOFLINE_BANDWIDTH_EFFICIENCY = 0.8
 
+# Fraction of VRAM a serving engine reserves for weights + KV cache (vLLM default)
+KV_CACHE_MEMORY_FRACTION = 0.9
 
-@dataclass
-class ModelSpecs:
-    """Model specifications"""
-    name: str
-    parameters_billions: float
-    model_size_gb: float
-    context_window: int
-    tokens_per_second: float
-    memory_efficiency: float
+# Upper bound for the batch size inverse solver
+MAX_SOLVER_BATCH_SIZE = 4096
+
+# Largest tensor-parallel group (GPUs in one NVLink/PCIe node)
+MAX_TENSOR_PARALLEL = 8
+
+# Fixed latency of one collective/point-to-point transfer between GPUs
+INTERCONNECT_LATENCY_US = 10.0
+
+# Electricity price ($/kWh)
+POWER_COST_PER_KWH = 0.12
+
+# Share of its rated power a provisioned GPU draws while idle
+IDLE_POWER_FRACTION = 0.3
+
+# Speculative decoding defaults: draft tokens proposed per target step and
+# the probability that the target accepts each draft token
+DEFAULT_SPECULATIVE_TOKENS = 4
+DEFAULT_ACCEPTANCE_RATE = 0.7
+
+# Latency above which a scenario is not considered acceptable
+LATENCY_THRESHOLD_MS = 5000
+
+# Default number of scenarios kept in the metrics cache
+DEFAULT_CACHE_SIZE = 1024
+
+# Minimum seconds between catalog file modification checks
+CATALOG_CHECK_INTERVAL_S = 2.0
+
+
+def _pins_catalog(method):
+    """Run a calculator method, and every method it calls, against one catalog snapshot"""
+    @wraps(method)
+    def pinned(self, *args, **kwargs):
+        if getattr(self._pinned, "catalog", None) is not None:
+            return method(self, *args, **kwargs)
+        self._pinned.catalog = self.catalog
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._pinned.catalog = None
+    return pinned
 
 
 class LLMInferenceCalculator:
     """Main calculator class for LLM inference estimates"""
     
-    def __init__(self):
-        self.hardware_specs = self._initialize_hardware_specs()
-        self.model_specs = self._initialize_model_specs()
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE, catalog_path: Optional[str] = None,
+        include_local_catalog: bool = True):
+        # Hardware/model specs and latency tables, loaded from a JSON catalog
+        # plus its host-local overlay (e.g. calibrated CPU profiles)
+        self.catalog_path = catalog_path or os.environ.get('LLM_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+        self.include_local_catalog = include_local_catalog
+        self.catalog = load_catalog(self.catalog_path, include_local_catalog)
+        self.catalog_error = None
+        self._catalog_lock = threading.Lock()
+        self._pinned = threading.local()
+        self._catalog_checked_at = time.monotonic()
         
-    def _initialize_hardware_specs(self) -> Dict[str, HardwareSpecs]:
-        """Initialize hardware specifications"""
-        return {
-            HardwareType.GPU_V100.value: HardwareSpecs(
-                name="NVIDIA V100",
-                vram_gb=16.0,
-                memory_bandwidth_gbps=900.0,
-                compute_tflops=112.0,
-                cost_per_hour=2.48,
-                power_consumption_w=250.0
-            ),
-            HardwareType.GPU_A100.value: HardwareSpecs(
-                name="NVIDIA A100",
-                vram_gb=40.0,
-                memory_bandwidth_gbps=1555.0,
-                compute_tflops=312.0,
-                cost_per_hour=3.26,
-                power_consumption_w=400.0
-            ),
-            HardwareType.GPU_H100.value: HardwareSpecs(
-                name="NVIDIA H100",
-                vram_gb=80.0,
-                memory_bandwidth_gbps=3350.0,
-                compute_tflops=989.0,
-                cost_per_hour=4.00,
-                power_consumption_w=700.0
-            ),
-            HardwareType.GPU_RTX4090.value: HardwareSpecs(
-                name="NVIDIA RTX 4090",
-                vram_gb=24.0,
-                memory_bandwidth_gbps=1008.0,
-                compute_tflops=83.0,
-                cost_per_hour=0.50,
-                power_consumption_w=450.0
-            ),
-            HardwareType.CPU.value: HardwareSpecs(
-                name="High-end CPU",
-                vram_gb=64.0,
-                memory_bandwidth_gbps=50.0,
-                compute_tflops=1.0,
-                cost_per_hour=0.10,
-                power_consumption_w=150.0
-            )
-        }
+        # Bounded LRU cache of calculate_inference_metrics results
+        self.cache_size = cache_size
+        self._metrics_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
     
-    def _initialize_model_specs(self) -> Dict[str, ModelSpecs]:
-        """Initialize model specifications"""
-        return {
-            ModelSize.SEVEN_B.value: ModelSpecs(
-                name="7B Parameter Model",
-                parameters_billions=7.0,
-                model_size_gb=14.0,
-                context_window=8192,
-                tokens_per_second=50.0,
-                memory_efficiency=0.85
-            ),
-            ModelSize.THIRTEEN_B.value: ModelSpecs(
-                name="13B Parameter Model",
-                parameters_billions=13.0,
-                model_size_gb=26.0,
-                context_window=8192,
-                tokens_per_second=30.0,
-                memory_efficiency=0.80
-            ),
-            ModelSize.GPT4.value: ModelSpecs(
-                name="GPT-4",
-                parameters_billions=175.0,
-                model_size_gb=350.0,
-                context_window=8192,
-                tokens_per_second=15.0,
-                memory_efficiency=0.90
-            )
-        }
+    @property
+    def current_catalog(self) -> Catalog:
+        """Catalog pinned by the calculator call running on this thread, else the latest one"""
+        return getattr(self._pinned, "catalog", None) or self.catalog
+    
+    @property
+    def hardware_specs(self) -> Dict[str, HardwareSpecs]:
+        """Hardware specifications of the current catalog"""
+        return self.current_catalog.hardware_specs
+    
+    @property
+    def model_specs(self) -> Dict[str, ModelSpecs]:
+        """Model specifications of the current catalog"""
+        return self.current_catalog.model_specs
+    
+    def reload_catalog(self) -> bool:
+        """Reload the catalog file, keeping the current catalog if it is invalid
+        
+        The new catalog is fully parsed and validated before it replaces the
+        old one with a single reference assignment. Every public calculator
+        method pins the catalog it started with for itself and the methods it
+        calls, so a call running during a reload uses either the old or the
+        new catalog throughout, never a mix. Returns True if the catalog was
+        replaced.
+        """
+        with self._catalog_lock:
+            try:
+                catalog = load_catalog(self.catalog_path, self.include_local_catalog)
+            except (OSError, CatalogError) as e:
+                self.catalog_error = str(e)
+                print(f"Warning: keeping catalog {self.catalog.version}, reload failed: {e}")
+                return False
+            self.catalog = catalog
+            self.catalog_error = None
+        # Cached results were computed from the previous catalog
+        self.clear_cache()
+        return True
     
+    def reload_catalog_if_changed(self) -> bool:
+        """Reload the catalog if its file or overlay changed, checking at most every CATALOG_CHECK_INTERVAL_S"""
+        now = time.monotonic()
+        if now - self._catalog_checked_at < CATALOG_CHECK_INTERVAL_S:
+            return False
+        self._catalog_checked_at = now
+        try:
+            mtime = catalog_mtime(self.catalog_path, self.include_local_catalog)
+        except OSError:
+            return False
+        if mtime == self.catalog.mtime:
+            return False
+        return self.reload_catalog()
+    
+    @_pins_catalog
     def calculate_memory_usage(self, model_size: str, tokens: int, batch_size: int, 
-        hardware_type: str, deployment_mode: str) -> Dict[str, float]:
-        """Calculate memory usage for inference"""
+        hardware_type: str, deployment_mode: str, precision: str = Precision.FP16.value,
+        kv_precision: Optional[str] = None, draft_model: Optional[str] = None,
+        speculative_tokens: int = DEFAULT_SPECULATIVE_TOKENS, shared_prefix_tokens: int = 0,
+        prefix_cache_hit_rate: float = 0.0, prompt_tokens: int = 0) -> Dict[str, float]:
+        """Calculate memory usage for inference
+        
+        The KV cache and activations hold the whole context of every
+        sequence, prompt_tokens plus the tokens generated. `precision` is the
+        weight format and `kv_precision` the KV cache format (the model's
+        native KV dtype when None). With a draft_model,
+        the draft's weights and KV cache are added and every sequence holds
+        speculative_tokens extra unverified tokens. With prefix caching, the
+        sequences that hit the cache share a single copy of the KV blocks of
+        the shared prefix, which is at most prompt_tokens long.
+        """
         model = self.model_specs[model_size]
         hardware = self.hardware_specs[hardware_type]
         
         # Base model memory (weights)
-        model_memory_gb = model.model_size_gb
+        model_memory_gb = self.weight_memory_gb(model_size, precision)
+        
+        # KV cache memory (keys and values for every layer and KV head)
+        kv_bytes_per_token = self.kv_cache_bytes_per_token(model_size, kv_precision)
+        context_tokens = prompt_tokens + tokens
+        kv_tokens = context_tokens * batch_size
+        if draft_model is not None:
+            kv_tokens += speculative_tokens * batch_size
+        shared_tokens = min(shared_prefix_tokens, prompt_tokens)
+        prefix_saved_tokens = max(prefix_cache_hit_rate * batch_size - 1, 0) * shared_tokens
+        kv_tokens -= prefix_saved_tokens
+        kv_cache_memory_gb = (kv_tokens * kv_bytes_per_token) / (1024**3)
         
-        # KV cache memory (depends on sequence length and batch size)
-        kv_cache_memory_gb = (tokens * batch_size * model.parameters_billions * 2 * 4) / (1024**3)
+        # Draft model weights and KV cache (speculative decoding)
+        draft_memory_gb = 0.0
+        if draft_model is not None:
+            draft_memory_gb = (self.weight_memory_gb(draft_model, precision)
+                               + (context_tokens + speculative_tokens) * batch_size
+                               * self.kv_cache_bytes_per_token(draft_model) / (1024**3))
         
         # Activation memory (rough estimate)
-        activation_memory_gb = (tokens * batch_size * model.parameters_billions * 0.1) / (1024**3)
+        activation_memory_gb = (context_tokens * batch_size * model.parameters_billions * 0.1) / (1024**3)
         
         # Total memory usage
-        total_memory_gb = model_memory_gb + kv_cache_memory_gb + activation_memory_gb
+        total_memory_gb = model_memory_gb + kv_cache_memory_gb + activation_memory_gb + draft_memory_gb
         
         # Apply memory efficiency factor
         effective_memory_gb = total_memory_gb / model.memory_efficiency
@@ -163,48 +285,102 @@ class LLMInferenceCalculator:
             "effective_memory_gb": effective_memory_gb,
             "hardware_memory_gb": hardware.vram_gb,
             "memory_fits": memory_fits,
-            "memory_utilization_percent": (effective_memory_gb / hardware.vram_gb) * 100
+            "memory_utilization_percent": (effective_memory_gb / hardware.vram_gb) * 100,
+            "kv_cache_bytes_per_token": kv_bytes_per_token,
+            "draft_memory_gb": draft_memory_gb,
+            "prefix_cache_saved_gb": prefix_saved_tokens * kv_bytes_per_token / (1024**3)
         }
     
-    def calculate_latency(self, model_size: str, tokens: int, batch_size: int,
-        hardware_type: str, deployment_mode: str) -> Dict[str, float]:
-        """Calculate inference latency"""
+    def weight_memory_gb(self, model_size: str, precision: str = Precision.FP16.value) -> float:
+        """Size of the model weights in the given precision"""
+        model = self.model_specs[model_size]
+        return model.model_size_gb * _precision_bytes(precision) / PRECISION_BYTES[Precision.FP16.value]
+    
+    def kv_cache_bytes_per_token(self, model_size: str, kv_precision: Optional[str] = None) -> float:
+        """KV cache bytes per token from the model architecture"""
+        model = self.model_specs[model_size]
+        if kv_precision is None:
+            dtype_bytes = model.kv_dtype_bytes
+        elif kv_precision in KV_CACHE_PRECISIONS:
+            dtype_bytes = PRECISION_BYTES[kv_precision]
+        else:
+            raise ValueError(f"Unsupported KV cache precision: {kv_precision}")
+        return kv_cache_bytes_per_token(model.num_layers, model.num_kv_heads, model.head_dim, dtype_bytes)
+    
+    @_pins_catalog
+    def calculate_kv_cache(self, model_size: str, hardware_type: str,
+        context_lengths: Union[int, List[int]], block_size: int = DEFAULT_BLOCK_SIZE,
+        memory_fraction: float = KV_CACHE_MEMORY_FRACTION, precision: str = Precision.FP16.value,
+        kv_precision: Optional[str] = None) -> Dict[str, any]:
+        """Estimate how many sequences fit in the KV cache with paged attention
+        
+        The KV pool is the usable VRAM (memory_fraction of the card) minus
+        the weights, split into blocks of block_size tokens. Sequences from
+        the context_lengths mix are admitted through a simulated paged block
+        allocator until the pool is exhausted. For comparison, the result
+        also gives the concurrency of a contiguous allocator that reserves
+        the full context window per sequence.
+        """
         model = self.model_specs[model_size]
         hardware = self.hardware_specs[hardware_type]
+        if isinstance(context_lengths, int):
+            context_lengths = [context_lengths]
         
-        # Base latency calculation based on model size and hardware
-        # Simplified approach focusing on realistic estimates
+        bytes_per_token = self.kv_cache_bytes_per_token(model_size, kv_precision)
+        block_bytes = bytes_per_token * block_size
+        pool_gb = max(hardware.vram_gb * memory_fraction - self.weight_memory_gb(model_size, precision), 0.0)
+        num_blocks = int(pool_gb * 1024**3 // block_bytes)
         
-        # Model-specific base latency (ms per token)
-        base_latency_per_token_ms = {
-            "7B": 20.0,    # ~50 tokens/second
-            "13B": 33.0,   # ~30 tokens/second  
-            "GPT-4": 67.0  # ~15 tokens/second
-        }
+        allocation = simulate_paged_allocation(num_blocks, block_size, context_lengths)
+        contiguous_sequences = int(pool_gb * 1024**3 // (bytes_per_token * model.context_window))
         
-        # Hardware efficiency factors
-        hardware_efficiency = {
-            "RTX4090": 1.0,
-            "V100": 0.8,
-            "A100": 0.6,
-            "H100": 0.4,
-            "CPU": 5.0
+        return {
+            "kv_cache_bytes_per_token": bytes_per_token,
+            "block_size": block_size,
+            "block_bytes": block_bytes,
+            "kv_pool_gb": pool_gb,
+            "total_blocks": num_blocks,
+            "max_tokens_in_cache": num_blocks * block_size,
+            "contiguous_max_sequences": contiguous_sequences,
+            **allocation
         }
+    
+    @_pins_catalog
+    def calculate_latency(self, model_size: str, tokens: int, batch_size: int,
+        hardware_type: str, deployment_mode: str,
+        latency_mode: str = LatencyMode.EMPIRICAL.value,
+        prompt_tokens: int = 0, precision: str = Precision.FP16.value,
+        kv_precision: Optional[str] = None, cached_prompt_tokens: float = 0) -> Dict[str, float]:
+        """Calculate inference latency
+        
+        The default empirical mode scales per-model ms/token tables. The
+        roofline mode derives prefill and decode time from the hardware's
+        TFLOPS and memory bandwidth (see _calculate_roofline_latency).
+        Decode is bandwidth-bound, so lower-precision weights shorten it in
+        proportion to their bytes per parameter (plus dequantization cost).
+        cached_prompt_tokens (served from a prefix cache) skip prefill; only
+        the roofline mode models prefill separately.
+        """
+        if latency_mode == LatencyMode.ROOFLINE.value:
+            return self._calculate_roofline_latency(model_size, tokens, batch_size, hardware_type,
+                                                    deployment_mode, prompt_tokens, precision, kv_precision,
+                                                    cached_prompt_tokens)
+        if latency_mode != LatencyMode.EMPIRICAL.value:
+            raise ValueError(f"Unknown latency mode: {latency_mode}")
         
         # Calculate base latency
-        base_latency_ms = tokens * base_latency_per_token_ms[model_size]
+        catalog = self.current_catalog
+        base_latency_ms = tokens * catalog.model_base_latency_ms[model_size]
         
         # Apply hardware efficiency
-        hardware_adjusted_latency_ms = base_latency_ms * hardware_efficiency[hardware_type]
+        hardware_adjusted_latency_ms = base_latency_ms * catalog.hardware_latency_efficiency[hardware_type]
         
-        # Apply deployment mode factors
-        deployment_factors = {
-            DeploymentMode.LOCAL.value: 1.0,
-            DeploymentMode.CLOUD.value: 1.1,  # Slight network overhead
-            DeploymentMode.EDGE.value: 1.3    # Limited resources
-        }
+        # Apply weight precision (tables are for FP16 weights)
+        hardware_adjusted_latency_ms *= (_precision_bytes(precision) / PRECISION_BYTES[Precision.FP16.value]
+                                         * DEQUANTIZATION_OVERHEAD[precision])
         
-        total_latency_ms = hardware_adjusted_latency_ms * deployment_factors[deployment_mode]
+        # Apply deployment mode factors
+        total_latency_ms = hardware_adjusted_latency_ms * DEPLOYMENT_FACTORS[deployment_mode]
         
         # Calculate tokens per second
         tokens_per_second = tokens / (total_latency_ms / 1000)
@@ -218,20 +394,190 @@ class LLMInferenceCalculator:
             "tokens_per_second": tokens_per_second
         }
     
+    @_pins_catalog
+    def roofline_rates(self, model_size: str, hardware_type: str, precision: str = Precision.FP16.value,
+        kv_precision: Optional[str] = None) -> Dict[str, float]:
+        """Effective compute/bandwidth rates and per-token work for the roofline model
+        
+        weight_bytes is the effective traffic of one pass over the weights,
+        including the dequantization overhead of quantized formats.
+        """
+        model = self.model_specs[model_size]
+        hardware = self.hardware_specs[hardware_type]
+        
+        return {
+            "flops_per_second": hardware.compute_tflops * 1e12 * ROOFLINE_COMPUTE_EFFICIENCY,
+            "bytes_per_second": hardware.memory_bandwidth_gbps * 1e9 * ROOFLINE_BANDWIDTH_EFFICIENCY,
+            "flops_per_token": 2 * model.parameters_billions * 1e9,
+            "weight_bytes": self.weight_memory_gb(model_size, precision) * 1e9 * DEQUANTIZATION_OVERHEAD[precision],
+            "kv_bytes_per_token": self.kv_cache_bytes_per_token(model_size, kv_precision)
+        }
+    
+    def _calculate_roofline_latency(self, model_size: str, tokens: int, batch_size: int,
+        hardware_type: str, deployment_mode: str, prompt_tokens: int,
+        precision: str = Precision.FP16.value, kv_precision: Optional[str] = None,
+        cached_prompt_tokens: float = 0) -> Dict[str, float]:
+        """Roofline latency: compute-bound prefill followed by bandwidth-bound decode
+        
+        `prompt_tokens` are processed in one prefill pass that produces the
+        first token; the remaining `tokens - 1` output tokens are generated
+        one decode step at a time. Each phase takes the longer of its compute
+        time (FLOPs / effective TFLOPS) and its memory time (bytes read /
+        effective bandwidth). Every decode step streams the full weights plus
+        the KV cache once for the whole batch, so batching amortizes weight
+        reads until the step becomes compute-bound at the critical batch size.
+        Prompt tokens served from a prefix cache are not prefilled but still
+        count towards the decode context.
+        
+        prefill_ms, decode_ms and overhead_ms split the total into hardware
+        prefill time, hardware decode time and deployment overhead. The
+        empirical compute/memory/model split does not apply and is None.
+        """
+        rates = self.roofline_rates(model_size, hardware_type, precision, kv_precision)
+        flops_per_second = rates["flops_per_second"]
+        bytes_per_second = rates["bytes_per_second"]
+        flops_per_token = rates["flops_per_token"]
+        weight_bytes = rates["weight_bytes"]
+        
+        phases = roofline_phase_times(rates, tokens, batch_size, prompt_tokens, cached_prompt_tokens)
+        prefill_compute_s = float(phases["prefill_compute_s"])
+        prefill_memory_s = float(phases["prefill_memory_s"])
+        prefill_s = float(phases["prefill_s"])
+        decode_steps = int(phases["decode_steps"])
+        decode_compute_s = float(phases["decode_compute_s"])
+        decode_memory_s = float(phases["decode_memory_s"])
+        decode_step_s = float(phases["decode_step_s"])
+        
+        deployment_factor = DEPLOYMENT_FACTORS[deployment_mode]
+        time_to_first_token_ms = prefill_s * 1000 * deployment_factor
+        inter_token_latency_ms = decode_step_s * 1000 * deployment_factor
+        decode_latency_ms = inter_token_latency_ms * decode_steps
+        total_latency_ms = time_to_first_token_ms + decode_latency_ms
+        hardware_latency_ms = (prefill_s + decode_step_s * decode_steps) * 1000
+        deployment_overhead_ms = hardware_latency_ms * (deployment_factor - 1)
+        
+        # Batch size at which decode turns compute-bound (ridge point)
+        ridge_point_flops_per_byte = flops_per_second / bytes_per_second
+        critical_batch_size = ridge_point_flops_per_byte * weight_bytes / flops_per_token
+        
+        return {
+            "compute_latency_ms": None,
+            "memory_latency_ms": None,
+            "model_latency_ms": None,
+            "prefill_ms": prefill_s * 1000,
+            "decode_ms": decode_step_s * decode_steps * 1000,
+            "overhead_ms": deployment_overhead_ms,
+            "total_latency_ms": total_latency_ms,
+            "total_latency_seconds": total_latency_ms / 1000,
+            "tokens_per_second": tokens / (total_latency_ms / 1000),
+            "time_to_first_token_ms": time_to_first_token_ms,
+            "inter_token_latency_ms": inter_token_latency_ms,
+            "decode_latency_ms": decode_latency_ms,
+            "prefill_bound": "compute" if prefill_compute_s >= prefill_memory_s else "memory",
+            "decode_bound": "compute" if decode_compute_s >= decode_memory_s else "memory",
+            "throughput_tokens_per_second": tokens * batch_size / (total_latency_ms / 1000),
+            "decode_arithmetic_intensity": batch_size * flops_per_token / (decode_memory_s * bytes_per_second),
+            "ridge_point_flops_per_byte": ridge_point_flops_per_byte,
+            "critical_batch_size": critical_batch_size
+        }
+    
+    @_pins_catalog
+    def calculate_speculative_decoding(self, model_size: str, draft_model: str, tokens: int,
+        batch_size: int, hardware_type: str, deployment_mode: str,
+        speculative_tokens: int = DEFAULT_SPECULATIVE_TOKENS,
+        acceptance_rate: float = DEFAULT_ACCEPTANCE_RATE,
+        latency_mode: str = LatencyMode.EMPIRICAL.value, prompt_tokens: int = 0,
+        precision: str = Precision.FP16.value, kv_precision: Optional[str] = None) -> Dict[str, float]:
+        """Decode speedup of speculative decoding with a draft model
+        
+        Each step the draft proposes k = speculative_tokens tokens and the
+        target verifies them in one forward pass. With a per-token acceptance
+        rate a, a step yields (1 - a^(k+1)) / (1 - a) tokens on average and
+        costs k draft decode steps plus one verification pass. Verification
+        reads the weights once like a normal decode step; in roofline mode it
+        becomes more expensive once the k+1 tokens per sequence make the step
+        compute-bound.
+        """
+        if draft_model not in self.model_specs:
+            raise ValueError(f"Unknown draft model: {draft_model}")
+        if speculative_tokens < 1:
+            raise ValueError("speculative_tokens must be at least 1")
+        if not 0 <= acceptance_rate <= 1:
+            raise ValueError("acceptance_rate must be between 0 and 1")
+        
+        def decode_ms_per_token(model):
+            latency = self.calculate_latency(model, tokens, batch_size, hardware_type, deployment_mode,
+                                             latency_mode=latency_mode, prompt_tokens=prompt_tokens,
+                                             precision=precision,
+                                             kv_precision=kv_precision if model == model_size else None)
+            if "inter_token_latency_ms" in latency:
+                return latency["inter_token_latency_ms"]
+            return latency["total_latency_ms"] / tokens
+        
+        draft_cost_ratio = decode_ms_per_token(draft_model) / decode_ms_per_token(model_size)
+        
+        verification_cost = 1.0
+        if latency_mode == LatencyMode.ROOFLINE.value:
+            rates = self.roofline_rates(model_size, hardware_type, precision, kv_precision)
+            step_flops_s = batch_size * rates["flops_per_token"] / rates["flops_per_second"]
+            step_memory_s = (rates["weight_bytes"] + rates["kv_bytes_per_token"]
+                             * math.ceil(prompt_tokens + tokens / 2) * batch_size) / rates["bytes_per_second"]
+            verification_cost = (max(step_flops_s * (speculative_tokens + 1), step_memory_s)
+                                 / max(step_flops_s, step_memory_s))
+        
+        if acceptance_rate < 1:
+            tokens_per_step = (1 - acceptance_rate ** (speculative_tokens + 1)) / (1 - acceptance_rate)
+        else:
+            tokens_per_step = speculative_tokens + 1
+        step_cost = verification_cost + speculative_tokens * draft_cost_ratio
+        
+        return {
+            "draft_model": draft_model,
+            "speculative_tokens": speculative_tokens,
+            "acceptance_rate": acceptance_rate,
+            "expected_tokens_per_step": tokens_per_step,
+            "draft_cost_ratio": draft_cost_ratio,
+            "verification_cost": verification_cost,
+            "decode_speedup": tokens_per_step / step_cost
+        }
+    
+    @_pins_catalog
     def calculate_cost(self, model_size: str, tokens: int, batch_size: int,
-        hardware_type: str, deployment_mode: str, requests_per_hour: int = 1) -> Dict[str, float]:
-        """Calculate inference costs"""
+        hardware_type: str, deployment_mode: str, requests_per_hour: int = 1,
+        latency_info: Optional[Dict[str, float]] = None, precision: str = Precision.FP16.value,
+        kv_precision: Optional[str] = None,
+        cost_mode: str = CostMode.PER_REQUEST.value, prompt_tokens: int = 0,
+        cached_prompt_tokens: float = 0, decode_speedup: float = 1.0) -> Dict[str, float]:
+        """Calculate inference costs
+        
+        The default per-request mode charges each request the GPU time of
+        its own latency; a precomputed latency_info for the same scenario can
+        be passed in to avoid recalculating it. The throughput mode serves
+        batches of concurrent requests per GPU and always uses roofline
+        latency, since the empirical tables do not depend on batch size (see
+        _calculate_throughput_cost); it ignores latency_info.
+        """
         hardware = self.hardware_specs[hardware_type]
         
+        if cost_mode == CostMode.THROUGHPUT.value:
+            return self._calculate_throughput_cost(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                                   requests_per_hour, prompt_tokens, precision, kv_precision,
+                                                   cached_prompt_tokens, decode_speedup)
+        if cost_mode != CostMode.PER_REQUEST.value:
+            raise ValueError(f"Unknown cost mode: {cost_mode}")
+        
         # Calculate time per request
-        latency_info = self.calculate_latency(model_size, tokens, batch_size, hardware_type, deployment_mode)
+        if latency_info is None:
+            latency_info = self.calculate_latency(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                                  prompt_tokens=prompt_tokens, precision=precision,
+                                                  kv_precision=kv_precision)
         time_per_request_hours = latency_info["total_latency_seconds"] / 3600
         
         # Cost per request
         cost_per_request = time_per_request_hours * hardware.cost_per_hour
         
-        # Power cost (assuming $0.12/kWh)
-        power_cost_per_hour = (hardware.power_consumption_w / 1000) * 0.12
+        # Power cost
+        power_cost_per_hour = (hardware.power_consumption_w / 1000) * POWER_COST_PER_KWH
         power_cost_per_request = time_per_request_hours * power_cost_per_hour
         
         # Total cost per request
@@ -253,15 +599,96 @@ class LLMInferenceCalculator:
             "monthly_cost": hourly_cost * 24 * 30
         }
     
+    def _calculate_throughput_cost(self, model_size: str, tokens: int, batch_size: int,
+        hardware_type: str, deployment_mode: str, requests_per_hour: float, prompt_tokens: int,
+        precision: str, kv_precision: Optional[str], cached_prompt_tokens: float,
+        decode_speedup: float) -> Dict[str, float]:
+        """Fleet cost for a request rate served by batched single-GPU replicas
+        
+        The batch is capped at the largest one that fits in VRAM
+        (solve_max_batch_size); feasible is False when not even one sequence
+        fits, in which case the figures are for a batch of one. A replica
+        completes served_batch_size requests every roofline request latency,
+        which gives its request rate and aggregate tokens/sec. Enough replicas
+        are provisioned for requests_per_hour and paid for all hour; the share
+        of that spend not doing work is reported as idle cost. Power is drawn
+        at IDLE_POWER_FRACTION of the rating when idle. With requests_per_hour
+        of 0 the per-request and per-token costs are reported as 0.
+        """
+        hardware = self.hardware_specs[hardware_type]
+        max_batch_size = self.solve_max_batch_size(model_size, tokens, hardware_type, deployment_mode,
+                                                   prompt_tokens=prompt_tokens, precision=precision,
+                                                   kv_precision=kv_precision)["max_batch_size"]
+        served_batch_size = max(min(batch_size, max_batch_size), 1)
+        latency_info = self.calculate_latency(model_size, tokens, served_batch_size, hardware_type, deployment_mode,
+                                              latency_mode=LatencyMode.ROOFLINE.value, prompt_tokens=prompt_tokens,
+                                              precision=precision, kv_precision=kv_precision,
+                                              cached_prompt_tokens=cached_prompt_tokens)
+        if decode_speedup != 1.0:
+            latency_info = _apply_decode_speedup(latency_info, tokens, served_batch_size, decode_speedup)
+        
+        latency_hours = latency_info["total_latency_seconds"] / 3600
+        replica_requests_per_hour = served_batch_size / latency_hours
+        replicas = max(1, math.ceil(requests_per_hour / replica_requests_per_hour))
+        utilization = requests_per_hour / (replicas * replica_requests_per_hour)
+        
+        hardware_cost_per_hour = replicas * hardware.cost_per_hour
+        power_kw = replicas * hardware.power_consumption_w / 1000
+        power_cost_per_hour = (power_kw * (IDLE_POWER_FRACTION + (1 - IDLE_POWER_FRACTION) * utilization)
+                               * POWER_COST_PER_KWH)
+        hourly_cost = hardware_cost_per_hour + power_cost_per_hour
+        
+        # With no traffic there is nothing to spread the fleet cost over
+        if requests_per_hour > 0:
+            cost_per_request = hardware_cost_per_hour / requests_per_hour
+            power_cost_per_request = power_cost_per_hour / requests_per_hour
+        else:
+            cost_per_request = power_cost_per_request = 0.0
+        total_cost_per_request = cost_per_request + power_cost_per_request
+        
+        return {
+            "cost_mode": CostMode.THROUGHPUT.value,
+            "cost_per_request": cost_per_request,
+            "power_cost_per_request": power_cost_per_request,
+            "total_cost_per_request": total_cost_per_request,
+            "cost_per_1k_tokens": (total_cost_per_request / tokens) * 1000,
+            "hourly_cost": hourly_cost,
+            "daily_cost": hourly_cost * 24,
+            "monthly_cost": hourly_cost * 24 * 30,
+            "feasible": max_batch_size >= 1,
+            "served_batch_size": served_batch_size,
+            "max_batch_size": max_batch_size,
+            "request_latency_seconds": latency_info["total_latency_seconds"],
+            "replicas": replicas,
+            "replica_requests_per_hour": replica_requests_per_hour,
+            "aggregate_tokens_per_second": tokens * served_batch_size / latency_info["total_latency_seconds"],
+            "utilization_percent": utilization * 100,
+            "idle_cost_per_hour": hardware_cost_per_hour * (1 - utilization)
+        }
+    
+    @_pins_catalog
     def check_hardware_compatibility(self, model_size: str, tokens: int, batch_size: int,
-        hardware_type: str, deployment_mode: str) -> Dict[str, any]:
-        """Check hardware compatibility and provide recommendations"""
-        memory_info = self.calculate_memory_usage(model_size, tokens, batch_size, hardware_type, deployment_mode)
-        latency_info = self.calculate_latency(model_size, tokens, batch_size, hardware_type, deployment_mode)
+        hardware_type: str, deployment_mode: str,
+        memory_info: Optional[Dict[str, float]] = None,
+        latency_info: Optional[Dict[str, float]] = None, precision: str = Precision.FP16.value,
+        kv_precision: Optional[str] = None, prompt_tokens: int = 0) -> Dict[str, any]:
+        """Check hardware compatibility and provide recommendations
+        
+        Precomputed memory_info/latency_info for the same scenario can be
+        passed in to avoid recalculating them.
+        """
+        if memory_info is None:
+            memory_info = self.calculate_memory_usage(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                                      precision=precision, kv_precision=kv_precision,
+                                                      prompt_tokens=prompt_tokens)
+        if latency_info is None:
+            latency_info = self.calculate_latency(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                                  prompt_tokens=prompt_tokens, precision=precision,
+                                                  kv_precision=kv_precision)
         
         # Compatibility checks
         memory_compatible = memory_info["memory_fits"]
-        latency_acceptable = latency_info["total_latency_ms"] < 5000  # 5 seconds threshold
+        latency_acceptable = latency_info["total_latency_ms"] < LATENCY_THRESHOLD_MS
         
         # Performance score (0-100)
         memory_score = max(0, 100 - memory_info["memory_utilization_percent"])
@@ -270,7 +697,16 @@ class LLMInferenceCalculator:
         
         # Recommendations
         recommendations = []
+        parallelism = None
         if not memory_compatible:
+            parallelism = self.plan_parallelism(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                                memory_info=memory_info, precision=precision,
+                                                kv_precision=kv_precision, prompt_tokens=prompt_tokens)
+            if parallelism["fits"]:
+                recommendations.append(
+                    f"Shard across {parallelism['gpus_per_replica']} GPUs "
+                    f"(tensor parallel {parallelism['tensor_parallel']} x "
+                    f"pipeline parallel {parallelism['pipeline_parallel']})")
             recommendations.append("Consider using a GPU with more VRAM or reducing batch size")
         if not latency_acceptable:
             recommendations.append("Consider using a more powerful GPU or reducing model size")
@@ -285,26 +721,320 @@ class LLMInferenceCalculator:
             "performance_score": performance_score,
             "recommendations": recommendations,
             "memory_utilization_percent": memory_info["memory_utilization_percent"],
-            "latency_ms": latency_info["total_latency_ms"]
+            "latency_ms": latency_info["total_latency_ms"],
+            "parallelism": parallelism
         }
     
+    @_pins_catalog
+    def plan_parallelism(self, model_size: str, tokens: int, batch_size: int,
+        hardware_type: str, deployment_mode: str, requests_per_hour: int = 1,
+        memory_info: Optional[Dict[str, float]] = None, precision: str = Precision.FP16.value,
+        kv_precision: Optional[str] = None, prompt_tokens: int = 0) -> Dict[str, any]:
+        """Plan the smallest tensor/pipeline-parallel layout that fits in memory
+        
+        Tensor parallelism (TP) splits every layer across up to
+        MAX_TENSOR_PARALLEL GPUs of one node and must divide the KV heads;
+        pipeline parallelism (PP) splits the layers into stages. The plan
+        uses the fewest GPUs whose per-GPU share of the effective memory fits
+        in VRAM, preferring more TP over more PP at equal GPU count. Decode
+        time per token is the roofline step time divided by TP plus the
+        interconnect cost: two all-reduces
+        of the hidden state per layer for TP and one activation hand-off per
+        stage boundary for PP. Throughput is conservative (no pipelining of
+        microbatches across stages).
+        """
+        model = self.model_specs[model_size]
+        hardware = self.hardware_specs[hardware_type]
+        if memory_info is None:
+            memory_info = self.calculate_memory_usage(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                                      precision=precision, kv_precision=kv_precision,
+                                                      prompt_tokens=prompt_tokens)
+        required_gb = memory_info["effective_memory_gb"]
+        
+        def per_gpu_gb(tp, pp):
+            return required_gb * math.ceil(model.num_layers / pp) / model.num_layers / tp
+        
+        tp_options = [tp for tp in (1, 2, 4, 8)
+                      if tp <= MAX_TENSOR_PARALLEL and model.num_kv_heads % tp == 0]
+        best = None
+        for tp in tp_options:
+            for pp in range(1, model.num_layers + 1):
+                if per_gpu_gb(tp, pp) <= hardware.vram_gb:
+                    if best is None or tp * pp <= best[0] * best[1]:
+                        best = (tp, pp)
+                    break
+        fits = best is not None
+        tensor_parallel, pipeline_parallel = best if fits else (tp_options[-1], model.num_layers)
+        gpus = tensor_parallel * pipeline_parallel
+        
+        # Decode step: roofline time shared by the TP group, plus communication
+        rates = self.roofline_rates(model_size, hardware_type, precision, kv_precision)
+        compute_s = batch_size * rates["flops_per_token"] / rates["flops_per_second"]
+        memory_s = (rates["weight_bytes"] + rates["kv_bytes_per_token"] * (prompt_tokens + tokens) * batch_size) / rates["bytes_per_second"]
+        step_compute_s = max(compute_s, memory_s) / tensor_parallel
+        
+        activation_bytes = model.hidden_size * 2 * batch_size
+        interconnect_bytes_per_second = hardware.interconnect_bandwidth_gbps * 1e9
+        latency_s = INTERCONNECT_LATENCY_US / 1e6
+        tp_comm_s = 0.0
+        if tensor_parallel > 1:
+            ring_bytes = 2 * (tensor_parallel - 1) / tensor_parallel * activation_bytes
+            tp_comm_s = 2 * model.num_layers * (ring_bytes / interconnect_bytes_per_second + latency_s)
+        pp_comm_s = (pipeline_parallel - 1) * (activation_bytes / interconnect_bytes_per_second + latency_s)
+        comm_s = tp_comm_s + pp_comm_s
+        
+        deployment_factor = DEPLOYMENT_FACTORS[deployment_mode]
+        inter_token_latency_ms = (step_compute_s + comm_s) * 1000 * deployment_factor
+        replica_tokens_per_second = batch_size / (inter_token_latency_ms / 1000)
+        
+        power_cost_per_hour = (hardware.power_consumption_w / 1000) * POWER_COST_PER_KWH
+        replica_cost_per_hour = gpus * (hardware.cost_per_hour + power_cost_per_hour)
+        tokens_per_hour_needed = tokens * requests_per_hour
+        replicas_needed = max(1, math.ceil(tokens_per_hour_needed / (replica_tokens_per_second * 3600)))
+        
+        return {
+            "fits": fits,
+            "min_gpus": math.ceil(required_gb / hardware.vram_gb),
+            "tensor_parallel": tensor_parallel,
+            "pipeline_parallel": pipeline_parallel,
+            "gpus_per_replica": gpus,
+            "memory_per_gpu_gb": per_gpu_gb(tensor_parallel, pipeline_parallel),
+            "tensor_parallel_comm_ms_per_token": tp_comm_s * 1000 * deployment_factor,
+            "pipeline_parallel_comm_ms_per_token": pp_comm_s * 1000 * deployment_factor,
+            "comm_overhead_percent": comm_s / (step_compute_s + comm_s) * 100,
+            "inter_token_latency_ms": inter_token_latency_ms,
+            "replica_tokens_per_second": replica_tokens_per_second,
+            "replica_cost_per_hour": replica_cost_per_hour,
+            "cost_per_1k_tokens": replica_cost_per_hour / (replica_tokens_per_second * 3600) * 1000,
+            "replicas_needed": replicas_needed,
+            "fleet_cost_per_hour": replicas_needed * replica_cost_per_hour
+        }
+    
+    @_pins_catalog
+    def max_token_batch_product(self, model_size: str, hardware_type: str,
+        precision: str = Precision.FP16.value, kv_precision: Optional[str] = None) -> int:
+        """Largest tokens x batch_size for which calculate_memory_usage fits in VRAM
+        
+        Effective memory is (weights + tokens * batch * per-token bytes) /
+        memory_efficiency, where per-token bytes are the KV cache plus the
+        activation estimate, so the VRAM ceiling solves in closed form.
+        """
+        model = self.model_specs[model_size]
+        hardware = self.hardware_specs[hardware_type]
+        
+        free_gb = hardware.vram_gb * model.memory_efficiency - self.weight_memory_gb(model_size, precision)
+        if free_gb <= 0:
+            return 0
+        bytes_per_token = (self.kv_cache_bytes_per_token(model_size, kv_precision)
+                           + model.parameters_billions * 0.1)
+        return int(free_gb * 1024**3 // bytes_per_token)
+    
+    @_pins_catalog
+    def solve_max_batch_size(self, model_size: str, tokens: int, hardware_type: str,
+        deployment_mode: str, latency_slo_ms: Optional[float] = None,
+        latency_mode: str = LatencyMode.EMPIRICAL.value, prompt_tokens: int = 0,
+        precision: str = Precision.FP16.value, kv_precision: Optional[str] = None) -> Dict[str, any]:
+        """Largest batch size that fits in VRAM and, if given, meets the latency SLO
+        
+        The memory limit is closed-form over prompt plus output tokens; the
+        latency limit is found by bisection since latency never decreases
+        with batch size.
+        """
+        memory_limit = min(self.max_token_batch_product(model_size, hardware_type, precision, kv_precision)
+                           // max(prompt_tokens + tokens, 1), MAX_SOLVER_BATCH_SIZE)
+        
+        latency_limit = None
+        if latency_slo_ms is not None:
+            latency_limit = _bisect_max(
+                lambda batch: self.calculate_latency(
+                    model_size, tokens, batch, hardware_type, deployment_mode, latency_mode=latency_mode,
+                    prompt_tokens=prompt_tokens, precision=precision, kv_precision=kv_precision
+                )["total_latency_ms"] <= latency_slo_ms,
+                1, MAX_SOLVER_BATCH_SIZE)
+        
+        return _solver_result("max_batch_size", {"memory": memory_limit, "latency": latency_limit})
+    
+    @_pins_catalog
+    def solve_max_tokens(self, model_size: str, batch_size: int, hardware_type: str,
+        deployment_mode: str, latency_slo_ms: Optional[float] = None,
+        latency_mode: str = LatencyMode.EMPIRICAL.value, prompt_tokens: int = 0,
+        precision: str = Precision.FP16.value, kv_precision: Optional[str] = None) -> Dict[str, any]:
+        """Largest token count that fits in VRAM, the context window and, if given, the latency SLO
+        
+        With a prompt, the context window and VRAM bound prompt plus output
+        tokens; latency is bisected over the output tokens.
+        """
+        model = self.model_specs[model_size]
+        product = self.max_token_batch_product(model_size, hardware_type, precision, kv_precision)
+        memory_limit = max(product // max(batch_size, 1) - prompt_tokens, 0)
+        context_limit = max(model.context_window - prompt_tokens, 0)
+        
+        latency_limit = None
+        if latency_slo_ms is not None:
+            latency_limit = _bisect_max(
+                lambda tokens: self.calculate_latency(
+                    model_size, tokens, batch_size, hardware_type, deployment_mode, latency_mode=latency_mode,
+                    prompt_tokens=prompt_tokens, precision=precision, kv_precision=kv_precision
+                )["total_latency_ms"] <= latency_slo_ms,
+                1, max(context_limit, 1))
+        
+        return _solver_result("max_tokens", {"memory": memory_limit, "context_window": context_limit,
+                                             "latency": latency_limit})
+    
+    @_pins_catalog
+    def solve_max_concurrent_sequences(self, model_size: str, context_length: int, hardware_type: str,
+        deployment_mode: str, latency_slo_ms: Optional[float] = None, prompt_tokens: int = 0,
+        precision: str = Precision.FP16.value, kv_precision: Optional[str] = None) -> Dict[str, any]:
+        """Most sequences of context_length that can run concurrently
+        
+        The memory limit comes from the paged KV cache allocator; the
+        latency limit is the largest roofline batch decoding
+        context_length - prompt_tokens tokens within the SLO.
+        """
+        kv_cache = self.calculate_kv_cache(model_size, hardware_type, context_length,
+                                           precision=precision, kv_precision=kv_precision)
+        
+        latency_limit = None
+        if latency_slo_ms is not None:
+            output_tokens = max(context_length - prompt_tokens, 1)
+            latency_limit = _bisect_max(
+                lambda batch: self.calculate_latency(
+                    model_size, output_tokens, batch, hardware_type, deployment_mode,
+                    latency_mode=LatencyMode.ROOFLINE.value, prompt_tokens=prompt_tokens,
+                    precision=precision, kv_precision=kv_precision
+                )["total_latency_ms"] <= latency_slo_ms,
+                1, MAX_SOLVER_BATCH_SIZE)
+        
+        return _solver_result("max_concurrent_sequences",
+                              {"kv_cache": kv_cache["max_concurrent_sequences"], "latency": latency_limit})
+    
+    @_pins_catalog
     def calculate_inference_metrics(self, model_size: str, tokens: int, batch_size: int,
         hardware_type: str, deployment_mode: str, 
-        requests_per_hour: int = 1) -> Dict[str, any]:
-        """Calculate all inference metrics"""
-        memory_info = self.calculate_memory_usage(model_size, tokens, batch_size, hardware_type, deployment_mode)
-        latency_info = self.calculate_latency(model_size, tokens, batch_size, hardware_type, deployment_mode)
-        cost_info = self.calculate_cost(model_size, tokens, batch_size, hardware_type, deployment_mode, requests_per_hour)
-        compatibility_info = self.check_hardware_compatibility(model_size, tokens, batch_size, hardware_type, deployment_mode)
+        requests_per_hour: int = 1,
+        latency_mode: str = LatencyMode.EMPIRICAL.value,
+        prompt_tokens: int = 0, precision: str = Precision.FP16.value,
+        kv_precision: Optional[str] = None, draft_model: Optional[str] = None,
+        speculative_tokens: int = DEFAULT_SPECULATIVE_TOKENS,
+        acceptance_rate: float = DEFAULT_ACCEPTANCE_RATE,
+        shared_prefix_tokens: int = 0, prefix_cache_hit_rate: float = 0.0,
+        cost_mode: str = CostMode.PER_REQUEST.value) -> Dict[str, any]:
+        """Calculate all inference metrics
         
-        return {
+        Setting draft_model enables speculative decoding, and a
+        prefix_cache_hit_rate with shared_prefix_tokens enables prompt prefix
+        caching; the result then has a serving_optimizations section
+        comparing throughput, cost and memory with the plain scenario.
+        
+        Results are memoized in a bounded LRU cache keyed on the normalized
+        inputs, so repeated scenarios are served without recomputation. The
+        returned dict is shared with the cache and should be treated as
+        read-only.
+        """
+        key = (model_size, int(tokens), int(batch_size), hardware_type,
+               deployment_mode, int(requests_per_hour), latency_mode, int(prompt_tokens),
+               precision, kv_precision, draft_model, int(speculative_tokens), float(acceptance_rate),
+               int(shared_prefix_tokens), float(prefix_cache_hit_rate), cost_mode)
+        # Keyed on the pinned catalog, so a result is never served for another catalog
+        catalog = self.current_catalog
+        
+        with self._cache_lock:
+            result = self._metrics_cache.get((catalog, key))
+            if result is not None:
+                self._metrics_cache.move_to_end((catalog, key))
+                self.cache_hits += 1
+                return result
+            self.cache_misses += 1
+        
+        result = self._evaluate_scenario(*key)
+        
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._metrics_cache[(catalog, key)] = result
+                self._metrics_cache.move_to_end((catalog, key))
+                while len(self._metrics_cache) > self.cache_size:
+                    self._metrics_cache.popitem(last=False)
+        
+        return result
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Get metrics cache statistics"""
+        with self._cache_lock:
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "size": len(self._metrics_cache),
+                "max_size": self.cache_size
+            }
+    
+    def clear_cache(self):
+        """Drop all cached metrics and reset the hit/miss counters"""
+        with self._cache_lock:
+            self._metrics_cache.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+    
+    def _evaluate_scenario(self, model_size: str, tokens: int, batch_size: int,
+        hardware_type: str, deployment_mode: str, requests_per_hour: int,
+        latency_mode: str, prompt_tokens: int, precision: str,
+        kv_precision: Optional[str], draft_model: Optional[str] = None,
+        speculative_tokens: int = DEFAULT_SPECULATIVE_TOKENS,
+        acceptance_rate: float = DEFAULT_ACCEPTANCE_RATE,
+        shared_prefix_tokens: int = 0, prefix_cache_hit_rate: float = 0.0,
+        cost_mode: str = CostMode.PER_REQUEST.value) -> Dict[str, any]:
+        """Compute all metrics for one scenario, evaluating each intermediate once"""
+        if not 0 <= prefix_cache_hit_rate <= 1:
+            raise ValueError("prefix_cache_hit_rate must be between 0 and 1")
+        prefix_caching = prefix_cache_hit_rate > 0 and shared_prefix_tokens > 0
+        cached_prompt_tokens = prefix_cache_hit_rate * min(shared_prefix_tokens, prompt_tokens)
+        
+        memory_info = self.calculate_memory_usage(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                                  precision=precision, kv_precision=kv_precision,
+                                                  draft_model=draft_model, speculative_tokens=speculative_tokens,
+                                                  shared_prefix_tokens=shared_prefix_tokens,
+                                                  prefix_cache_hit_rate=prefix_cache_hit_rate,
+                                                  prompt_tokens=prompt_tokens)
+        latency_info = self.calculate_latency(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                              latency_mode=latency_mode, prompt_tokens=prompt_tokens,
+                                              precision=precision, kv_precision=kv_precision,
+                                              cached_prompt_tokens=cached_prompt_tokens)
+        speculative_info = None
+        if draft_model is not None:
+            speculative_info = self.calculate_speculative_decoding(
+                model_size, draft_model, tokens, batch_size, hardware_type, deployment_mode,
+                speculative_tokens, acceptance_rate, latency_mode, prompt_tokens, precision, kv_precision)
+            latency_info = _apply_decode_speedup(latency_info, tokens, batch_size,
+                                                 speculative_info["decode_speedup"])
+        cost_info = self.calculate_cost(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                        requests_per_hour, latency_info=latency_info, precision=precision,
+                                        kv_precision=kv_precision, cost_mode=cost_mode,
+                                        prompt_tokens=prompt_tokens, cached_prompt_tokens=cached_prompt_tokens,
+                                        decode_speedup=speculative_info["decode_speedup"]
+                                        if speculative_info is not None else 1.0)
+        compatibility_info = self.check_hardware_compatibility(model_size, tokens, batch_size, hardware_type,
+                                                               deployment_mode, memory_info=memory_info,
+                                                               latency_info=latency_info, precision=precision,
+                                                               kv_precision=kv_precision,
+                                                               prompt_tokens=prompt_tokens)
+        
+        result = {
             "inputs": {
                 "model_size": model_size,
                 "tokens": tokens,
                 "batch_size": batch_size,
                 "hardware_type": hardware_type,
                 "deployment_mode": deployment_mode,
-                "requests_per_hour": requests_per_hour
+                "requests_per_hour": requests_per_hour,
+                "latency_mode": latency_mode,
+                "prompt_tokens": prompt_tokens,
+                "precision": precision,
+                "kv_precision": kv_precision,
+                "draft_model": draft_model,
+                "speculative_tokens": speculative_tokens,
+                "acceptance_rate": acceptance_rate,
+                "shared_prefix_tokens": shared_prefix_tokens,
+                "prefix_cache_hit_rate": prefix_cache_hit_rate,
+                "cost_mode": cost_mode
             },
             "memory": memory_info,
             "latency": latency_info,
@@ -318,6 +1048,315 @@ class LLMInferenceCalculator:
                 "performance_score": compatibility_info["performance_score"]
             }
         }
+        
+        if draft_model is not None or prefix_caching:
+            # Compare against the same scenario without the optimizations
+            baseline_memory = self.calculate_memory_usage(model_size, tokens, batch_size, hardware_type,
+                                                          deployment_mode, precision=precision,
+                                                          kv_precision=kv_precision, prompt_tokens=prompt_tokens)
+            baseline_latency = self.calculate_latency(model_size, tokens, batch_size, hardware_type,
+                                                      deployment_mode, latency_mode=latency_mode,
+                                                      prompt_tokens=prompt_tokens, precision=precision,
+                                                      kv_precision=kv_precision)
+            baseline_cost = self.calculate_cost(model_size, tokens, batch_size, hardware_type, deployment_mode,
+                                                requests_per_hour, latency_info=baseline_latency,
+                                                precision=precision, kv_precision=kv_precision,
+                                                cost_mode=cost_mode, prompt_tokens=prompt_tokens)
+            if baseline_cost["cost_per_1k_tokens"] > 0:
+                cost_saving_percent = (1 - cost_info["cost_per_1k_tokens"]
+                                       / baseline_cost["cost_per_1k_tokens"]) * 100
+            else:
+                cost_saving_percent = 0.0
+            result["serving_optimizations"] = {
+                "speculative_decoding": speculative_info,
+                "prefix_cache": {
+                    "cached_prompt_tokens_per_sequence": cached_prompt_tokens,
+                    "kv_cache_saved_gb": memory_info["prefix_cache_saved_gb"]
+                } if prefix_caching else None,
+                "baseline_tokens_per_second": baseline_latency["tokens_per_second"],
+                "tokens_per_second_gain_percent": (latency_info["tokens_per_second"]
+                                                   / baseline_latency["tokens_per_second"] - 1) * 100,
+                "baseline_cost_per_1k_tokens": baseline_cost["cost_per_1k_tokens"],
+                "cost_per_1k_tokens_saving_percent": cost_saving_percent,
+                "memory_delta_gb": memory_info["effective_memory_gb"] - baseline_memory["effective_memory_gb"],
+                "pays_off": cost_saving_percent > 0 and memory_info["memory_fits"]
+            }
+        
+        return result
+
+    @_pins_catalog
+    def calculate_sweep(self, model_sizes: Union[str, Iterable[str]],
+        tokens: Union[int, Iterable[int]],
+        batch_sizes: Union[int, Iterable[int]],
+        hardware_types: Union[str, Iterable[str]],
+        deployment_modes: Union[str, Iterable[str]],
+        requests_per_hour: Union[int, Iterable[int]] = 1,
+        precisions: Union[str, Iterable[str]] = Precision.FP16.value,
+        kv_precision: Optional[str] = None,
+        cost_mode: str = CostMode.PER_REQUEST.value) -> Dict[str, np.ndarray]:
+        """Calculate inference metrics for a whole grid of scenarios at once
+        
+        Every argument except kv_precision and cost_mode may be a single value, a
+        list/array or a range. The cartesian product of all inputs is
+        evaluated in one vectorized pass and returned as flat columns (one
+        array per metric, one row per scenario), using the same formulas as
+        calculate_inference_metrics with no prompt. Latency columns are
+        empirical; the throughput cost mode uses roofline latency at the
+        batch capped to VRAM, like calculate_cost.
+        """
+        model_axis = _as_axis(model_sizes)
+        token_axis = np.asarray(_as_axis(tokens), dtype=np.int64)
+        batch_axis = np.asarray(_as_axis(batch_sizes), dtype=np.int64)
+        hardware_axis = _as_axis(hardware_types)
+        deployment_axis = _as_axis(deployment_modes)
+        rph_axis = np.asarray(_as_axis(requests_per_hour), dtype=np.int64)
+        precision_axis = _as_axis(precisions)
+        
+        # Per-category lookup vectors (raises KeyError on unknown names,
+        # like the scalar methods)
+        catalog = self.current_catalog
+        model_rows = np.array([catalog.model_index[m] for m in model_axis], dtype=np.int64)
+        hardware_rows = np.array([catalog.hardware_index[h] for h in hardware_axis], dtype=np.int64)
+        model_size_gb = catalog.model_columns["model_size_gb"][model_rows]
+        parameters_billions = catalog.model_columns["parameters_billions"][model_rows]
+        memory_efficiency = catalog.model_columns["memory_efficiency"][model_rows]
+        kv_bytes_per_token = np.array([self.kv_cache_bytes_per_token(m, kv_precision) for m in model_axis])
+        base_latency_per_token_ms = catalog.model_columns["base_latency_per_token_ms"][model_rows]
+        vram_gb = catalog.hardware_columns["vram_gb"][hardware_rows]
+        cost_per_hour = catalog.hardware_columns["cost_per_hour"][hardware_rows]
+        power_consumption_w = catalog.hardware_columns["power_consumption_w"][hardware_rows]
+        compute_tflops = catalog.hardware_columns["compute_tflops"][hardware_rows]
+        memory_bandwidth_gbps = catalog.hardware_columns["memory_bandwidth_gbps"][hardware_rows]
+        hardware_efficiency = catalog.hardware_columns["latency_efficiency"][hardware_rows]
+        deployment_factor = np.array([DEPLOYMENT_FACTORS[d] for d in deployment_axis])
+        weight_scale = np.array([_precision_bytes(p) / PRECISION_BYTES[Precision.FP16.value]
+                                 for p in precision_axis])
+        dequantization_overhead = np.array([DEQUANTIZATION_OVERHEAD[p] for p in precision_axis])
+        precision_latency_factor = weight_scale * dequantization_overhead
+        
+        # Expand the grid into flat index arrays
+        shape = (len(model_axis), len(token_axis), len(batch_axis),
+                 len(hardware_axis), len(deployment_axis), len(rph_axis), len(precision_axis))
+        m_idx, t_idx, b_idx, h_idx, d_idx, r_idx, p_idx = np.unravel_index(
+            np.arange(math.prod(shape)), shape)
+        
+        n_tokens = token_axis[t_idx]
+        batch_size = batch_axis[b_idx]
+        rph = rph_axis[r_idx]
+        params = parameters_billions[m_idx]
+        hardware_memory_gb = vram_gb[h_idx]
+        
+        # Memory
+        model_memory_gb = model_size_gb[m_idx] * weight_scale[p_idx]
+        kv_cache_memory_gb = (n_tokens * batch_size * kv_bytes_per_token[m_idx]) / (1024**3)
+        activation_memory_gb = (n_tokens * batch_size * params * 0.1) / (1024**3)
+        total_memory_gb = model_memory_gb + kv_cache_memory_gb + activation_memory_gb
+        effective_memory_gb = total_memory_gb / memory_efficiency[m_idx]
+        memory_fits = effective_memory_gb <= hardware_memory_gb
+        memory_utilization_percent = (effective_memory_gb / hardware_memory_gb) * 100
+        
+        # Latency
+        hardware_adjusted_latency_ms = (n_tokens * base_latency_per_token_ms[m_idx]
+                                        * hardware_efficiency[h_idx] * precision_latency_factor[p_idx])
+        total_latency_ms = hardware_adjusted_latency_ms * deployment_factor[d_idx]
+        total_latency_seconds = total_latency_ms / 1000
+        tokens_per_second = n_tokens / total_latency_seconds
+        
+        # Cost
+        time_per_request_hours = total_latency_seconds / 3600
+        throughput_columns = {}
+        if cost_mode == CostMode.THROUGHPUT.value:
+            # Largest batch that fits (solve_max_batch_size), then roofline latency at it
+            free_bytes = (hardware_memory_gb * memory_efficiency[m_idx] - model_memory_gb) * 1024**3
+            bytes_per_token = kv_bytes_per_token[m_idx] + params * 0.1
+            token_batch_product = np.where(free_bytes > 0, np.floor_divide(free_bytes, bytes_per_token), 0)
+            max_batch_size = np.minimum(token_batch_product // np.maximum(n_tokens, 1),
+                                        MAX_SOLVER_BATCH_SIZE).astype(np.int64)
+            served_batch_size = np.maximum(np.minimum(batch_size, max_batch_size), 1)
+            rates = {
+                "flops_per_second": compute_tflops[h_idx] * 1e12 * ROOFLINE_COMPUTE_EFFICIENCY,
+                "bytes_per_second": memory_bandwidth_gbps[h_idx] * 1e9 * ROOFLINE_BANDWIDTH_EFFICIENCY,
+                "flops_per_token": 2 * params * 1e9,
+                "weight_bytes": model_memory_gb * 1e9 * dequantization_overhead[p_idx],
+                "kv_bytes_per_token": kv_bytes_per_token[m_idx]
+            }
+            phases = roofline_phase_times(rates, n_tokens, served_batch_size, 0)
+            request_latency_seconds = ((phases["prefill_s"] + phases["decode_step_s"] * phases["decode_steps"])
+                                       * deployment_factor[d_idx])
+            replica_rph = served_batch_size / (request_latency_seconds / 3600)
+            replicas = np.maximum(1, np.ceil(rph / replica_rph)).astype(np.int64)
+            utilization = rph / (replicas * replica_rph)
+            hardware_cost_per_hour = replicas * cost_per_hour[h_idx]
+            power_cost_per_hour = (replicas * power_consumption_w[h_idx] / 1000
+                                   * (IDLE_POWER_FRACTION + (1 - IDLE_POWER_FRACTION) * utilization)
+                                   * POWER_COST_PER_KWH)
+            # With no traffic there is nothing to spread the fleet cost over
+            has_traffic = rph > 0
+            requests = np.where(has_traffic, rph, 1)
+            cost_per_request = np.where(has_traffic, hardware_cost_per_hour / requests, 0.0)
+            power_cost_per_request = np.where(has_traffic, power_cost_per_hour / requests, 0.0)
+            hourly_cost = hardware_cost_per_hour + power_cost_per_hour
+            throughput_columns = {
+                "feasible": max_batch_size >= 1,
+                "served_batch_size": served_batch_size,
+                "max_batch_size": max_batch_size,
+                "request_latency_seconds": request_latency_seconds,
+                "replicas": replicas,
+                "replica_requests_per_hour": replica_rph,
+                "aggregate_tokens_per_second": n_tokens * served_batch_size / request_latency_seconds,
+                "utilization_percent": utilization * 100,
+                "idle_cost_per_hour": hardware_cost_per_hour * (1 - utilization)
+            }
+        elif cost_mode == CostMode.PER_REQUEST.value:
+            cost_per_request = time_per_request_hours * cost_per_hour[h_idx]
+            power_cost_per_request = (time_per_request_hours * (power_consumption_w[h_idx] / 1000)
+                                      * POWER_COST_PER_KWH)
+        else:
+            raise ValueError(f"Unknown cost mode: {cost_mode}")
+        total_cost_per_request = cost_per_request + power_cost_per_request
+        if cost_mode != CostMode.THROUGHPUT.value:
+            hourly_cost = total_cost_per_request * rph
+        
+        # Compatibility
+        memory_score = np.maximum(0, 100 - memory_utilization_percent)
+        latency_score = np.maximum(0, 100 - (total_latency_ms / 50))
+        
+        return {
+            "model_size": np.asarray(model_axis)[m_idx],
+            "tokens": n_tokens,
+            "batch_size": batch_size,
+            "hardware_type": np.asarray(hardware_axis)[h_idx],
+            "deployment_mode": np.asarray(deployment_axis)[d_idx],
+            "requests_per_hour": rph,
+            "precision": np.asarray(precision_axis)[p_idx],
+            "model_memory_gb": model_memory_gb,
+            "kv_cache_memory_gb": kv_cache_memory_gb,
+            "activation_memory_gb": activation_memory_gb,
+            "total_memory_gb": total_memory_gb,
+            "effective_memory_gb": effective_memory_gb,
+            "hardware_memory_gb": hardware_memory_gb,
+            "memory_fits": memory_fits,
+            "memory_utilization_percent": memory_utilization_percent,
+            "compute_latency_ms": hardware_adjusted_latency_ms * 0.7,
+            "memory_latency_ms": hardware_adjusted_latency_ms * 0.2,
+            "model_latency_ms": hardware_adjusted_latency_ms * 0.1,
+            "total_latency_ms": total_latency_ms,
+            "total_latency_seconds": total_latency_seconds,
+            "tokens_per_second": tokens_per_second,
+            "cost_per_request": cost_per_request,
+            "power_cost_per_request": power_cost_per_request,
+            "total_cost_per_request": total_cost_per_request,
+            "cost_per_1k_tokens": (total_cost_per_request / n_tokens) * 1000,
+            "hourly_cost": hourly_cost,
+            "daily_cost": hourly_cost * 24,
+            "monthly_cost": hourly_cost * 24 * 30,
+            **throughput_columns,
+            "memory_compatible": memory_fits,
+            "latency_acceptable": total_latency_ms < LATENCY_THRESHOLD_MS,
+            "performance_score": (memory_score + latency_score) / 2
+        }
+
+
+def _apply_decode_speedup(latency_info: Dict[str, float], tokens: int, batch_size: int,
+    speedup: float) -> Dict[str, float]:
+    """Latency with the decode phase shortened by a speedup factor
+    
+    The roofline result splits prefill and decode; the empirical result is
+    all per-token decode time.
+    """
+    total_ms = latency_info["total_latency_ms"]
+    decode_ms = latency_info.get("decode_latency_ms", total_ms)
+    new_total_ms = total_ms - decode_ms + decode_ms / speedup
+    adjusted = dict(latency_info)
+    if "decode_latency_ms" in latency_info:
+        adjusted["decode_latency_ms"] = decode_ms / speedup
+        adjusted["inter_token_latency_ms"] = latency_info["inter_token_latency_ms"] / speedup
+        decode_overhead_ms = decode_ms - latency_info["decode_ms"]
+        adjusted["decode_ms"] = latency_info["decode_ms"] / speedup
+        adjusted["overhead_ms"] = latency_info["overhead_ms"] - decode_overhead_ms * (1 - 1 / speedup)
+        adjusted["throughput_tokens_per_second"] = tokens * batch_size / (new_total_ms / 1000)
+    else:
+        for key in ("compute_latency_ms", "memory_latency_ms", "model_latency_ms"):
+            adjusted[key] = latency_info[key] / speedup
+    adjusted["total_latency_ms"] = new_total_ms
+    adjusted["total_latency_seconds"] = new_total_ms / 1000
+    adjusted["tokens_per_second"] = tokens / (new_total_ms / 1000)
+    adjusted["speculative_decode_speedup"] = speedup
+    return adjusted
+
+
+def roofline_phase_times(rates: Dict[str, float], tokens, batch_size, prompt_tokens,
+    cached_prompt_tokens=0) -> Dict[str, any]:
+    """Prefill and per-step decode times (seconds) of the roofline model
+    
+    `rates` are as returned by roofline_rates. Every argument may be a
+    scalar or a NumPy array, so the same formulas serve single scenarios,
+    sweeps and sampled lengths. Prefill runs the uncached prompt tokens of
+    every sequence in one forward pass; each decode step produces one token
+    per sequence, reading the weights and the KV cache at the average
+    context length of the generation.
+    """
+    flops_per_second = rates["flops_per_second"]
+    bytes_per_second = rates["bytes_per_second"]
+    flops_per_token = rates["flops_per_token"]
+    weight_bytes = rates["weight_bytes"]
+    
+    prefill_tokens = np.maximum(prompt_tokens - cached_prompt_tokens, 1) * batch_size
+    prefill_compute_s = prefill_tokens * flops_per_token / flops_per_second
+    prefill_memory_s = weight_bytes / bytes_per_second
+    
+    average_context = prompt_tokens + tokens / 2
+    kv_cache_bytes = rates["kv_bytes_per_token"] * np.ceil(average_context) * batch_size
+    decode_compute_s = batch_size * flops_per_token / flops_per_second
+    decode_memory_s = (weight_bytes + kv_cache_bytes) / bytes_per_second
+    
+    return {
+        "prefill_compute_s": prefill_compute_s,
+        "prefill_memory_s": prefill_memory_s,
+        "prefill_s": np.maximum(prefill_compute_s, prefill_memory_s),
+        "decode_steps": np.maximum(tokens - 1, 0),
+        "decode_compute_s": decode_compute_s,
+        "decode_memory_s": decode_memory_s,
+        "decode_step_s": np.maximum(decode_compute_s, decode_memory_s)
+    }
+
+
+def _bisect_max(predicate, lo: int, hi: int) -> int:
+    """Largest integer in [lo, hi] satisfying a monotone (true-then-false) predicate, or lo - 1"""
+    if not predicate(lo):
+        return lo - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if predicate(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _solver_result(name: str, limits: Dict[str, Optional[int]]) -> Dict[str, any]:
+    """Combine per-constraint limits into the binding one"""
+    active = {constraint: limit for constraint, limit in limits.items() if limit is not None}
+    limited_by = min(active, key=active.get)
+    return {
+        name: max(active[limited_by], 0),
+        "limited_by": limited_by,
+        "limits": limits
+    }
+
+
+def _precision_bytes(precision: str) -> float:
+    """Bytes per weight for a precision, validating the name"""
+    if precision not in PRECISION_BYTES:
+        raise ValueError(f"Unknown precision: {precision}")
+    return PRECISION_BYTES[precision]
+
+
+def _as_axis(values) -> list:
+    """Normalize a sweep argument (scalar, sequence, range or array) to a list"""
+    if isinstance(values, (str, int, float, np.generic)):
+        return [values]
+    return list(values)
 
 
 def main():
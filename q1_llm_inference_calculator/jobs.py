@@ -0,0 +1,333 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from capacity_planner import CapacityPlanner, pareto_frontier
+from catalog import DEFAULT_CATALOG_PATH, load_catalog
+from inference_calculator import LLMInferenceCalculator
+from queue_simulator import ContinuousBatchingSimulator
+
+
+# Scenarios per task for batch jobs
+BATCH_CHUNK_SCENARIOS = 1000
+
+# Approximate rows per task for sweep jobs
+SWEEP_CHUNK_ROWS = 1000000
+
+# Finished jobs kept for result retrieval before the oldest are dropped
+MAX_FINISHED_JOBS = 100
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+# Calculator of the current worker process, created by _init_worker
+_worker_calculator = None
+
+
+def _init_worker(catalog_path: str):
+    global _worker_calculator
+    _worker_calculator = LLMInferenceCalculator(catalog_path=catalog_path)
+
+
+def _calculator() -> LLMInferenceCalculator:
+    _worker_calculator.reload_catalog_if_changed()
+    return _worker_calculator
+
+
+def _run_batch_task(scenarios: List[dict], offset: int) -> List[dict]:
+    """Metrics for a chunk of scenarios, one success/error row each"""
+    calculator = _calculator()
+    rows = []
+    for index, scenario in enumerate(scenarios, offset):
+        try:
+            result = calculator.calculate_inference_metrics(**scenario)
+            rows.append({'index': index, 'success': True, 'result': result})
+        except Exception as e:
+            rows.append({'index': index, 'success': False, 'error': str(e)})
+    return rows
+
+
+def _run_sweep_task(params: dict) -> Dict[str, np.ndarray]:
+    return _calculator().calculate_sweep(**params)
+
+
+def _run_simulation_task(params: dict, requests_per_hour: float) -> dict:
+    simulator_params = {key: params[key] for key in
+                        ('model_size', 'hardware_type', 'deployment_mode', 'max_batch_size',
+                         'kv_budget_tokens', 'precision', 'kv_precision') if key in params}
+    simulate_params = {key: params[key] for key in
+                       ('num_requests', 'prompt_tokens', 'output_tokens', 'arrival_process', 'seed')
+                       if key in params}
+    simulator = ContinuousBatchingSimulator(_calculator(), **simulator_params)
+    return simulator.simulate(requests_per_hour, **simulate_params)
+
+
+def _run_plan_task(params: dict) -> dict:
+    return CapacityPlanner(_calculator()).plan(**params)
+
+
+class Job:
+    """State of one background job: its tasks, progress and result"""
+
+    def __init__(self, kind: str, num_tasks: int, merge: Callable[[list], any],
+        rows: Callable[[any], list]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.total_tasks = num_tasks
+        self.completed_tasks = 0
+        self.task_results = [None] * num_tasks
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.futures = []
+        self.merge = merge
+        self.rows = rows
+
+    def info(self) -> Dict[str, any]:
+        if self.status == QUEUED and any(future.running() for future in self.futures):
+            self.status = RUNNING
+            self.started_at = time.time()
+        return {
+            'job_id': self.id,
+            'type': self.kind,
+            'status': self.status,
+            'progress': self.completed_tasks / self.total_tasks if self.total_tasks else 1.0,
+            'completed_tasks': self.completed_tasks,
+            'total_tasks': self.total_tasks,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobManager:
+    """Run heavy calculator workloads in a process pool
+
+    Each job is split into independent tasks (chunks of scenarios, grid
+    slices, arrival rates or hardware types) so progress can be reported
+    per task, pending tasks can be cancelled, and partial results can be
+    streamed in order as tasks finish. Task results are merged into the
+    job result when the last task completes. The pool is created on first
+    use with one worker per core; each worker keeps its own calculator.
+    """
+
+    def __init__(self, catalog_path: Optional[str] = None, max_workers: Optional[int] = None,
+        max_finished_jobs: int = MAX_FINISHED_JOBS):
+        self.catalog_path = catalog_path or os.environ.get('LLM_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(self.catalog_path,))
+        return self._executor
+
+    def submit_batch(self, scenarios: List[dict]) -> Job:
+        """Evaluate calculate_inference_metrics keyword-argument dicts"""
+        chunks = [(scenarios[start:start + BATCH_CHUNK_SCENARIOS], start)
+                  for start in range(0, len(scenarios), BATCH_CHUNK_SCENARIOS)]
+        return self._submit('batch', _run_batch_task, chunks,
+                            merge=lambda parts: [row for part in parts for row in part],
+                            rows=lambda part: part)
+
+    def submit_sweep(self, params: dict) -> Job:
+        """Run calculate_sweep split into slices of the model and token axes
+
+        Slicing the two outermost grid axes keeps the merged rows in the
+        same order as a single calculate_sweep call.
+        """
+        models = _axis(params['model_sizes'])
+        tokens = _axis(params['tokens'])
+        rows_per_token = max(1, math.prod(len(_axis(params.get(name, default))) for name, default in
+                                          (('batch_sizes', 1), ('hardware_types', None),
+                                           ('deployment_modes', None), ('requests_per_hour', 1),
+                                           ('precisions', 'fp16'))))
+        tokens_per_chunk = max(1, SWEEP_CHUNK_ROWS // rows_per_token)
+        chunks = [({**params, 'model_sizes': [model], 'tokens': tokens[start:start + tokens_per_chunk]},)
+                  for model in models for start in range(0, len(tokens), tokens_per_chunk)]
+        return self._submit('sweep', _run_sweep_task, chunks, merge=_merge_columns, rows=_column_rows)
+
+    def submit_simulation(self, params: dict, requests_per_hour: List[float]) -> Job:
+        """Run the queue simulator once per arrival rate"""
+        chunks = [(params, rate) for rate in requests_per_hour]
+        return self._submit('simulate', _run_simulation_task, chunks,
+                            merge=lambda parts: parts, rows=lambda part: [part])
+
+    def submit_plan(self, params: dict) -> Job:
+        """Run the capacity planner split by hardware type"""
+        hardware_types = params.get('hardware_types') or list(load_catalog(self.catalog_path).hardware_specs)
+        chunks = [({**params, 'hardware_types': [hardware_type]},) for hardware_type in hardware_types]
+        return self._submit('plan', _run_plan_task, chunks, merge=_merge_plans,
+                            rows=lambda part: part['pareto_frontier'])
+
+    def _submit(self, kind: str, function, chunks: List[tuple], merge, rows) -> Job:
+        job = Job(kind, len(chunks), merge, rows)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+        if not chunks:
+            self._finish(job)
+            return job
+        pool = self._pool()
+        for index, args in enumerate(chunks):
+            future = pool.submit(function, *args)
+            with self._lock:
+                job.futures.append(future)
+                cancelled = job.status in (FAILED, CANCELLED)
+            if cancelled:
+                # The job was cancelled or failed while its tasks were being submitted
+                future.cancel()
+            future.add_done_callback(lambda f, index=index: self._task_done(job, index, f))
+        return job
+
+    def _task_done(self, job: Job, index: int, future):
+        # Cancelled tasks are accounted for by whoever cancelled them
+        if future.cancelled():
+            return
+        # Future.cancel() runs done callbacks synchronously, so futures are
+        # only ever cancelled after self._lock has been released
+        to_cancel = []
+        done = False
+        with self._lock:
+            if job.status in FINISHED_STATES:
+                return
+            try:
+                job.task_results[index] = future.result()
+            except CancelledError:
+                return
+            except Exception as e:
+                job.status = FAILED
+                job.error = str(e)
+                job.finished_at = time.time()
+                to_cancel = list(job.futures)
+            else:
+                if job.status == QUEUED:
+                    job.started_at = job.started_at or time.time()
+                    job.status = RUNNING
+                job.completed_tasks += 1
+                done = job.completed_tasks == job.total_tasks
+            self._changed.notify_all()
+        for other in to_cancel:
+            other.cancel()
+        if done:
+            self._finish(job)
+
+    def _finish(self, job: Job):
+        try:
+            result = job.merge(job.task_results)
+            error = None
+        except Exception as e:
+            result, error = None, str(e)
+        with self._lock:
+            if job.status in (FAILED, CANCELLED):
+                return
+            job.result = result
+            job.error = error
+            job.status = FAILED if error else COMPLETED
+            job.finished_at = time.time()
+            self._changed.notify_all()
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            if job_id not in self._jobs:
+                raise KeyError(f"Unknown job: {job_id}")
+            return self._jobs[job_id]
+
+    def list_jobs(self) -> List[Dict[str, any]]:
+        with self._lock:
+            return [job.info() for job in self._jobs.values()]
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a job; tasks already running finish but their results are discarded"""
+        job = self.get(job_id)
+        with self._lock:
+            if job.status in FINISHED_STATES:
+                return job
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            futures = list(job.futures)
+            self._changed.notify_all()
+        # Outside the lock: cancel() runs _task_done, which takes the lock
+        for future in futures:
+            future.cancel()
+        return job
+
+    def stream(self, job_id: str, timeout: Optional[float] = None) -> Iterator[dict]:
+        """Yield result rows task by task, in order, as the tasks complete
+
+        Stops early if the job fails or is cancelled, or when no new task
+        finishes within `timeout` seconds.
+        """
+        job = self.get(job_id)
+        for index in range(job.total_tasks):
+            with self._lock:
+                while job.task_results[index] is None and job.status not in (FAILED, CANCELLED):
+                    if not self._changed.wait(timeout):
+                        return
+                part = job.task_results[index]
+            if part is None:
+                return
+            yield from job.rows(part)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _axis(values) -> list:
+    if isinstance(values, (str, int, float)) or values is None:
+        return [values]
+    return list(values)
+
+
+def _merge_columns(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def _column_rows(columns: Dict[str, np.ndarray]) -> Iterator[dict]:
+    names = list(columns)
+    for values in zip(*(columns[name].tolist() for name in names)):
+        yield dict(zip(names, values))
+
+
+def _merge_plans(parts: List[dict]) -> dict:
+    """Combine per-hardware planner results; the union of frontiers contains the global frontier"""
+    frontier = pareto_frontier([candidate for part in parts for candidate in part['pareto_frontier']])
+    return {
+        'inputs': parts[0]['inputs'],
+        'cheapest': frontier[0] if frontier else None,
+        'pareto_frontier': frontier,
+        'candidates_evaluated': sum(part['candidates_evaluated'] for part in parts),
+        'candidates_pruned': sum(part['candidates_pruned'] for part in parts),
+        'candidates_feasible': sum(part['candidates_feasible'] for part in parts)
+    }
@@ -0,0 +1,108 @@
+from collections import deque
+from typing import Dict, List
+
+
+# Default number of tokens per KV cache block (vLLM default)
+DEFAULT_BLOCK_SIZE = 16
+
+
+def kv_cache_bytes_per_token(num_layers: int, num_kv_heads: int, head_dim: int,
+    dtype_bytes: float) -> float:
+    """Bytes of KV cache per token: a key and a value vector per KV head per layer"""
+    return 2 * num_layers * num_kv_heads * head_dim * dtype_bytes
+
+
+class PagedBlockAllocator:
+    """Simulated paged-attention KV cache allocator
+
+    The KV cache pool is split into fixed-size blocks of `block_size` tokens.
+    Each sequence owns a block table and takes a new block from the free list
+    whenever its last block is full, so the only waste is the unused tail of
+    each sequence's last block (internal fragmentation).
+    """
+
+    def __init__(self, num_blocks: int, block_size: int = DEFAULT_BLOCK_SIZE):
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        self.num_blocks = max(int(num_blocks), 0)
+        self.block_size = block_size
+        self.free_blocks = deque(range(self.num_blocks))
+        self.block_tables: Dict[int, List[int]] = {}
+        self.sequence_tokens: Dict[int, int] = {}
+
+    def blocks_needed(self, num_tokens: int) -> int:
+        """Number of blocks required to hold num_tokens"""
+        return -(-num_tokens // self.block_size)
+
+    def can_allocate(self, num_tokens: int) -> bool:
+        """Check whether a new sequence of num_tokens fits in the free pool"""
+        return self.blocks_needed(num_tokens) <= len(self.free_blocks)
+
+    def allocate(self, seq_id: int, num_tokens: int) -> bool:
+        """Allocate blocks for a new sequence; returns False if the pool is exhausted"""
+        if seq_id in self.block_tables:
+            raise ValueError(f"Sequence {seq_id} is already allocated")
+        needed = self.blocks_needed(num_tokens)
+        if needed > len(self.free_blocks):
+            return False
+        self.block_tables[seq_id] = [self.free_blocks.popleft() for _ in range(needed)]
+        self.sequence_tokens[seq_id] = num_tokens
+        return True
+
+    def append_tokens(self, seq_id: int, num_tokens: int = 1) -> bool:
+        """Grow a sequence, taking new blocks as needed; returns False if the pool is exhausted"""
+        new_total = self.sequence_tokens[seq_id] + num_tokens
+        table = self.block_tables[seq_id]
+        extra = self.blocks_needed(new_total) - len(table)
+        if extra > len(self.free_blocks):
+            return False
+        table.extend(self.free_blocks.popleft() for _ in range(extra))
+        self.sequence_tokens[seq_id] = new_total
+        return True
+
+    def free(self, seq_id: int):
+        """Release all blocks held by a sequence"""
+        self.free_blocks.extend(self.block_tables.pop(seq_id))
+        del self.sequence_tokens[seq_id]
+
+    @property
+    def used_blocks(self) -> int:
+        return self.num_blocks - len(self.free_blocks)
+
+    @property
+    def stored_tokens(self) -> int:
+        return sum(self.sequence_tokens.values())
+
+    @property
+    def internal_fragmentation(self) -> float:
+        """Fraction of allocated block slots that hold no token"""
+        slots = self.used_blocks * self.block_size
+        if slots == 0:
+            return 0.0
+        return 1 - self.stored_tokens / slots
+
+
+def simulate_paged_allocation(num_blocks: int, block_size: int,
+    context_lengths: List[int]) -> Dict[str, float]:
+    """Admit sequences from a context-length mix until the block pool is full
+
+    Sequences are taken round-robin from `context_lengths` (so the mix
+    reflects the relative frequency of each length) and admitted while their
+    blocks fit. Returns the number of admitted sequences and the resulting
+    block usage and fragmentation.
+    """
+    if not context_lengths or min(context_lengths) <= 0:
+        raise ValueError("context_lengths must be a non-empty list of positive lengths")
+    allocator = PagedBlockAllocator(num_blocks, block_size)
+
+    seq_id = 0
+    while allocator.allocate(seq_id, context_lengths[seq_id % len(context_lengths)]):
+        seq_id += 1
+
+    return {
+        "max_concurrent_sequences": seq_id,
+        "used_blocks": allocator.used_blocks,
+        "free_blocks": len(allocator.free_blocks),
+        "stored_tokens": allocator.stored_tokens,
+        "internal_fragmentation_percent": allocator.internal_fragmentation * 100
+    }
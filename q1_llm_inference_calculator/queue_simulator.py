@@ -0,0 +1,252 @@
+import heapq
+import json
+import math
+from collections import deque
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from inference_calculator import (
+    LLMInferenceCalculator,
+    DEPLOYMENT_FACTORS,
+    KV_CACHE_MEMORY_FRACTION,
+)
+
+
+# Latency percentiles reported by the simulator
+LATENCY_PERCENTILES = [50, 75, 90, 95, 99, 99.9]
+
+# Supported arrival processes
+ARRIVAL_PROCESSES = ["poisson", "constant"]
+
+
+class ContinuousBatchingSimulator:
+    """Discrete-event simulator of a continuous-batching inference server
+
+    Requests arrive according to an arrival process, wait in a FIFO queue and
+    are admitted into the running batch at step boundaries while the batch
+    has a free slot and the KV cache budget can hold the request's prompt
+    plus output tokens. Admitted prompts are prefilled together, then every
+    running sequence decodes one token per step. Step times come from the
+    calculator's roofline rates, so they grow with batch size and context.
+
+    Instead of ticking every decode step, the event loop jumps straight to
+    the next arrival or completion: all running sequences advance in
+    lockstep, so each sequence's completion is a single "finish step" in a
+    min-heap and the batch's total context is kept as running sums.
+    """
+
+    def __init__(self, calculator: LLMInferenceCalculator, model_size: str, hardware_type: str,
+        deployment_mode: str = "local", max_batch_size: int = 64,
+        kv_budget_tokens: Optional[int] = None, precision: str = "fp16",
+        kv_precision: Optional[str] = None):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self.calculator = calculator
+        self.model_size = model_size
+        self.hardware_type = hardware_type
+        self.deployment_mode = deployment_mode
+        self.max_batch_size = max_batch_size
+        self.precision = precision
+        self.kv_precision = kv_precision
+
+        rates = calculator.roofline_rates(model_size, hardware_type, precision, kv_precision)
+        self.flops_per_second = rates["flops_per_second"]
+        self.bytes_per_second = rates["bytes_per_second"]
+        self.flops_per_token = rates["flops_per_token"]
+        self.weight_bytes = rates["weight_bytes"]
+        self.kv_bytes_per_token = rates["kv_bytes_per_token"]
+        self.deployment_factor = DEPLOYMENT_FACTORS[deployment_mode]
+
+        if kv_budget_tokens is None:
+            hardware = calculator.hardware_specs[hardware_type]
+            weights_gb = calculator.weight_memory_gb(model_size, precision)
+            pool_gb = max(hardware.vram_gb * KV_CACHE_MEMORY_FRACTION - weights_gb, 0.0)
+            kv_budget_tokens = int(pool_gb * 1024**3 // self.kv_bytes_per_token)
+        self.kv_budget_tokens = kv_budget_tokens
+
+    def _decode_step_seconds(self, batch_size: int, context_tokens: int) -> float:
+        """Time of one decode step for the whole batch"""
+        compute_s = batch_size * self.flops_per_token / self.flops_per_second
+        memory_s = (self.weight_bytes + context_tokens * self.kv_bytes_per_token) / self.bytes_per_second
+        return max(compute_s, memory_s) * self.deployment_factor
+
+    def _prefill_seconds(self, prompt_tokens: int) -> float:
+        """Time to prefill a group of newly admitted prompts"""
+        compute_s = max(prompt_tokens, 1) * self.flops_per_token / self.flops_per_second
+        memory_s = self.weight_bytes / self.bytes_per_second
+        return max(compute_s, memory_s) * self.deployment_factor
+
+    def simulate(self, requests_per_hour: float, num_requests: int = 10000,
+        prompt_tokens: Union[int, Sequence[int]] = 512,
+        output_tokens: Union[int, Sequence[int]] = 256,
+        arrival_process: str = "poisson", seed: Optional[int] = 0) -> Dict[str, any]:
+        """Simulate num_requests requests and report latency and utilization
+
+        prompt_tokens/output_tokens are either a fixed length or a list of
+        observed lengths to sample from. Latencies are in milliseconds.
+        """
+        if arrival_process not in ARRIVAL_PROCESSES:
+            raise ValueError(f"Unknown arrival process: {arrival_process}")
+        if requests_per_hour <= 0 or num_requests <= 0:
+            raise ValueError("requests_per_hour and num_requests must be positive")
+
+        rng = np.random.default_rng(seed)
+        mean_gap_s = 3600.0 / requests_per_hour
+        if arrival_process == "poisson":
+            gaps = rng.exponential(mean_gap_s, num_requests)
+        else:
+            gaps = np.full(num_requests, mean_gap_s)
+        arrivals_arr = np.cumsum(gaps) - gaps[0]
+        prompts_arr = _sample_lengths(rng, prompt_tokens, num_requests)
+        outputs_arr = np.maximum(_sample_lengths(rng, output_tokens, num_requests), 1)
+
+        too_large = prompts_arr + outputs_arr > self.kv_budget_tokens
+        if too_large.any():
+            raise ValueError(f"{int(too_large.sum())} requests exceed the KV cache budget of "
+                             f"{self.kv_budget_tokens} tokens")
+
+        arrivals = arrivals_arr.tolist()
+        prompts = prompts_arr.tolist()
+        outputs = outputs_arr.tolist()
+        admitted_at = [0.0] * num_requests
+        first_token_at = [0.0] * num_requests
+        finished_at = [0.0] * num_requests
+        start_step = [0] * num_requests
+
+        queue = deque()
+        running = []            # heap of (finish_step, request index)
+        step = 0                # decode steps taken by every running sequence
+        prompt_sum = 0          # sum of prompt lengths in the batch
+        start_step_sum = 0      # sum of start steps in the batch
+        kv_reserved = 0
+        now = 0.0
+        busy_s = 0.0
+        batch_step_sum = 0      # sum over decode steps of the batch size
+        decode_steps = 0
+        next_arrival = 0
+        completed = 0
+        max_batch = self.max_batch_size
+        kv_budget = self.kv_budget_tokens
+
+        while completed < num_requests:
+            while next_arrival < num_requests and arrivals[next_arrival] <= now:
+                queue.append(next_arrival)
+                next_arrival += 1
+
+            # Admit queued requests while a batch slot and KV budget are free
+            admitted_prompt_tokens = 0
+            newly_admitted = []
+            while queue and len(running) < max_batch:
+                request = queue[0]
+                need = prompts[request] + outputs[request]
+                if kv_reserved + need > kv_budget:
+                    break
+                queue.popleft()
+                kv_reserved += need
+                admitted_at[request] = now
+                start_step[request] = step
+                prompt_sum += prompts[request]
+                start_step_sum += step
+                admitted_prompt_tokens += prompts[request]
+                newly_admitted.append(request)
+                # The prefill produces the first token, the rest are decoded
+                heapq.heappush(running, (step + outputs[request] - 1, request))
+
+            if not running:
+                now = max(now, arrivals[next_arrival])
+                continue
+
+            if newly_admitted:
+                prefill_s = self._prefill_seconds(admitted_prompt_tokens)
+                now += prefill_s
+                busy_s += prefill_s
+                for request in newly_admitted:
+                    first_token_at[request] = now
+
+            # Advance to the next completion or the step boundary after the next arrival
+            batch = len(running)
+            context = prompt_sum + batch * step - start_step_sum
+            step_s = self._decode_step_seconds(batch, context)
+            steps = running[0][0] - step
+            if steps > 0 and next_arrival < num_requests and len(running) < max_batch:
+                steps_to_arrival = max(1, math.ceil((arrivals[next_arrival] - now) / step_s))
+                steps = min(steps, steps_to_arrival)
+
+            now += steps * step_s
+            busy_s += steps * step_s
+            step += steps
+            decode_steps += steps
+            batch_step_sum += steps * batch
+
+            while running and running[0][0] <= step:
+                _, request = heapq.heappop(running)
+                finished_at[request] = now
+                prompt_sum -= prompts[request]
+                start_step_sum -= start_step[request]
+                kv_reserved -= prompts[request] + outputs[request]
+                completed += 1
+
+        arrivals_s = arrivals_arr
+        latency_ms = (np.asarray(finished_at) - arrivals_s) * 1000
+        ttft_ms = (np.asarray(first_token_at) - arrivals_s) * 1000
+        queueing_ms = (np.asarray(admitted_at) - arrivals_s) * 1000
+        makespan_s = max(now, 1e-12)
+        total_output_tokens = int(outputs_arr.sum())
+
+        return {
+            "inputs": {
+                "model_size": self.model_size,
+                "hardware_type": self.hardware_type,
+                "deployment_mode": self.deployment_mode,
+                "requests_per_hour": requests_per_hour,
+                "num_requests": num_requests,
+                "arrival_process": arrival_process,
+                "max_batch_size": self.max_batch_size,
+                "precision": self.precision,
+                "kv_precision": self.kv_precision,
+                "kv_budget_tokens": self.kv_budget_tokens
+            },
+            "latency_percentiles_ms": _percentiles(latency_ms),
+            "time_to_first_token_percentiles_ms": _percentiles(ttft_ms),
+            "queueing_delay_percentiles_ms": _percentiles(queueing_ms),
+            "mean_latency_ms": float(latency_ms.mean()),
+            "mean_queueing_delay_ms": float(queueing_ms.mean()),
+            "gpu_utilization_percent": busy_s / makespan_s * 100,
+            "mean_batch_size": batch_step_sum / decode_steps if decode_steps else 0.0,
+            "offered_requests_per_hour": requests_per_hour,
+            "achieved_requests_per_hour": num_requests / makespan_s * 3600,
+            "sustainable_requests_per_hour": num_requests / busy_s * 3600 if busy_s else 0.0,
+            "output_tokens_per_second": total_output_tokens / makespan_s,
+            "simulated_seconds": makespan_s
+        }
+
+
+def _sample_lengths(rng: np.random.Generator, lengths: Union[int, Sequence[int]],
+    size: int) -> np.ndarray:
+    """Draw token lengths from a fixed value or a list of observed lengths"""
+    if isinstance(lengths, (int, np.integer)):
+        return np.full(size, int(lengths), dtype=np.int64)
+    return rng.choice(np.asarray(lengths, dtype=np.int64), size)
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    """Percentile curve keyed as p50, p99, p99.9, ..."""
+    points = np.percentile(values, LATENCY_PERCENTILES)
+    return {f"p{p:g}": float(v) for p, v in zip(LATENCY_PERCENTILES, points)}
+
+
+def main():
+    """Example: 7B model on an A100 at increasing load"""
+    calculator = LLMInferenceCalculator()
+    simulator = ContinuousBatchingSimulator(calculator, "7B", "A100", "cloud", max_batch_size=64)
+
+    for requests_per_hour in [1000, 10000, 50000]:
+        print(f"=== 7B on A100 at {requests_per_hour} requests/hour ===")
+        result = simulator.simulate(requests_per_hour, num_requests=20000,
+                                    prompt_tokens=[256, 512, 1024, 2048], output_tokens=[64, 256, 512])
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
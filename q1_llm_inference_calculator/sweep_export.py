@@ -0,0 +1,199 @@
+import argparse
+import csv
+import os
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow export is optional
+    pa = None
+
+from inference_calculator import LLMInferenceCalculator
+
+
+# Rows per record batch / row group / CSV chunk, so readers can stream
+EXPORT_BATCH_ROWS = 65536
+
+# Export formats by file extension; parquet and arrow need pyarrow
+EXPORT_FORMATS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".csv": "csv"
+}
+
+
+def export_sweep(columns: Dict[str, np.ndarray], path: str, format: Optional[str] = None) -> str:
+    """Write calculate_sweep columns to a columnar file and return the path written
+
+    The format is taken from `format` or the file extension. Without
+    pyarrow, Parquet/Arrow requests fall back to CSV next to the requested
+    path (same name, .csv extension). CSV headers carry each column's dtype
+    as `name:dtype` so it can be read back with the right types.
+    """
+    format = format or EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if format not in ("parquet", "arrow", "csv"):
+        raise ValueError(f"Unknown export format for {path}; use one of {sorted(set(EXPORT_FORMATS.values()))}")
+    if format != "csv" and pa is None:
+        print(f"Warning: pyarrow is not installed, writing CSV instead of {format}")
+        format = "csv"
+        path = os.path.splitext(path)[0] + ".csv"
+
+    if format == "csv":
+        _write_csv(columns, path)
+        return path
+
+    table = pa.table({name: _to_arrow(values) for name, values in columns.items()})
+    if format == "parquet":
+        pq.write_table(table, path, row_group_size=EXPORT_BATCH_ROWS)
+    else:
+        # Uncompressed IPC file, so readers can memory-map it without copies
+        with pa.OSFile(path, "wb") as sink:
+            with pa_ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=EXPORT_BATCH_ROWS)
+    return path
+
+
+def iter_sweep_batches(path: str, columns: Optional[List[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Stream an exported sweep as dicts of NumPy columns, one batch at a time
+
+    Arrow files are memory-mapped and numeric columns are zero-copy views of
+    the mapping; Parquet files are memory-mapped and decoded one row group
+    at a time; CSV files are parsed in EXPORT_BATCH_ROWS chunks. Only the
+    requested columns are decoded.
+    """
+    format = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if format == "csv":
+        yield from _iter_csv(path, columns)
+        return
+    if format is None:
+        raise ValueError(f"Unknown sweep file format: {path}")
+    if pa is None:
+        raise ImportError(f"pyarrow is required to read {path}")
+
+    if format == "parquet":
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=EXPORT_BATCH_ROWS, columns=columns):
+            yield _batch_to_numpy(batch)
+    else:
+        with pa.memory_map(path, "r") as source:
+            reader = pa_ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                yield _batch_to_numpy(batch)
+
+
+def read_sweep(path: str, columns: Optional[List[str]] = None,
+    where: Optional[Callable[[Dict[str, np.ndarray]], np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """Read an exported sweep, optionally keeping only rows matching a filter
+
+    `where` receives each batch as a dict of columns and returns a boolean
+    mask, e.g. `lambda b: (b["hardware_type"] == "A100") & b["memory_fits"]`.
+    Filtering happens batch by batch, so only matching rows are held in
+    memory. Columns used by `where` must be among `columns`.
+    """
+    parts = []
+    for batch in iter_sweep_batches(path, columns):
+        if where is not None:
+            mask = np.asarray(where(batch), dtype=bool)
+            batch = {name: values[mask] for name, values in batch.items()}
+        parts.append(batch)
+    if not parts:
+        return {}
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def _to_arrow(values: np.ndarray):
+    """NumPy column as an Arrow array; categorical string columns are dictionary-encoded"""
+    array = pa.array(np.asarray(values))
+    if pa.types.is_string(array.type):
+        return array.dictionary_encode()
+    return array
+
+
+def _batch_to_numpy(batch) -> Dict[str, np.ndarray]:
+    """Arrow record batch as NumPy columns (zero-copy where Arrow allows it)"""
+    result = {}
+    for name, column in zip(batch.schema.names, batch.columns):
+        if pa.types.is_dictionary(column.type):
+            categories = np.asarray(column.dictionary.to_pylist())
+            result[name] = categories[column.indices.to_numpy(zero_copy_only=False)]
+        elif pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            result[name] = np.asarray(column.to_pylist())
+        else:
+            result[name] = column.to_numpy(zero_copy_only=False)
+    return result
+
+
+def _write_csv(columns: Dict[str, np.ndarray], path: str):
+    """Write columns as CSV with `name:dtype` headers"""
+    arrays = {name: np.asarray(values) for name, values in columns.items()}
+    num_rows = len(next(iter(arrays.values()))) if arrays else 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([f"{name}:{values.dtype.str}" for name, values in arrays.items()])
+        for start in range(0, num_rows, EXPORT_BATCH_ROWS):
+            chunk = [values[start:start + EXPORT_BATCH_ROWS].tolist() for values in arrays.values()]
+            writer.writerows(zip(*chunk))
+
+
+def _iter_csv(path: str, columns: Optional[List[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Parse a CSV export in chunks, restoring column dtypes from the header"""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = [field.rsplit(":", 1) for field in next(reader)]
+        selected = [(i, name, np.dtype(dtype)) for i, (name, dtype) in enumerate(header)
+                    if columns is None or name in columns]
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == EXPORT_BATCH_ROWS:
+                yield _csv_chunk(rows, selected)
+                rows = []
+        if rows:
+            yield _csv_chunk(rows, selected)
+
+
+def _csv_chunk(rows: List[List[str]], selected) -> Dict[str, np.ndarray]:
+    """Convert parsed CSV rows to typed NumPy columns"""
+    result = {}
+    for i, name, dtype in selected:
+        values = [row[i] for row in rows]
+        if dtype.kind == "b":
+            result[name] = np.array(values) == "True"
+        else:
+            result[name] = np.array(values).astype(dtype)
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run a sweep and export it"""
+    parser = argparse.ArgumentParser(description="Run a calculator sweep and export it as Parquet/Arrow/CSV")
+    parser.add_argument("output", help="output file (.parquet, .arrow/.feather or .csv)")
+    parser.add_argument("--model-sizes", nargs="+", default=["7B", "13B"])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[256, 512, 1024, 2048, 4096])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--hardware", nargs="+", default=None)
+    parser.add_argument("--deployment-modes", nargs="+", default=["local", "cloud", "edge"])
+    parser.add_argument("--requests-per-hour", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--precisions", nargs="+", default=["fp16"])
+    parser.add_argument("--cost-mode", default="per_request")
+    args = parser.parse_args(argv)
+
+    calculator = LLMInferenceCalculator()
+    columns = calculator.calculate_sweep(
+        args.model_sizes, args.tokens, args.batch_sizes,
+        args.hardware or list(calculator.hardware_specs.keys()), args.deployment_modes,
+        args.requests_per_hour, args.precisions, cost_mode=args.cost_mode)
+    path = export_sweep(columns, args.output)
+    print(f"Wrote {len(columns['tokens'])} scenarios to {path}")
+
+
+if __name__ == "__main__":
+    main()
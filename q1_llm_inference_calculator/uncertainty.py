@@ -0,0 +1,190 @@
+import argparse
+import json
+import math
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from inference_calculator import (
+    LLMInferenceCalculator,
+    LatencyMode,
+    DEPLOYMENT_FACTORS,
+    POWER_COST_PER_KWH,
+    roofline_phase_times,
+)
+
+
+# Percentiles reported for every sampled metric
+UNCERTAINTY_PERCENTILES = [5, 50, 95]
+
+# Default coefficients of variation of the sampled inputs
+DEFAULT_TOKENS_CV = 0.3
+DEFAULT_EFFICIENCY_CV = 0.15  # achieved vs. modelled hardware speed
+DEFAULT_PRICE_CV = 0.1        # on-demand/spot/reserved price spread
+
+
+class UncertaintyEstimator:
+    """Monte Carlo uncertainty bands for latency, throughput and cost
+
+    Output/prompt lengths, a hardware efficiency multiplier and a price
+    multiplier are sampled per draw, and latency and cost are evaluated for
+    all draws in one vectorized pass. Both latency models are linear in a
+    few per-scenario constants, so those are computed once with the scalar
+    calculator and only the sampled terms are arrays: the empirical model is
+    a fixed cost per output token, the roofline model a prefill plus
+    per-step decode cost that depend on the sampled lengths.
+
+    Lengths are a fixed value with a coefficient of variation (sampled
+    log-normally around it) or a list of observed lengths to sample from.
+    Multipliers are log-normal with mean 1.
+    """
+
+    def __init__(self, calculator: Optional[LLMInferenceCalculator] = None):
+        self.calculator = calculator or LLMInferenceCalculator()
+
+    def estimate(self, model_size: str, tokens: Union[int, Sequence[int]], batch_size: int,
+        hardware_type: str, deployment_mode: str, requests_per_hour: float = 1,
+        latency_mode: str = LatencyMode.EMPIRICAL.value,
+        prompt_tokens: Union[int, Sequence[int]] = 0, precision: str = "fp16",
+        kv_precision: Optional[str] = None, shared_prefix_tokens: int = 0,
+        prefix_cache_hit_rate: float = 0.0, num_samples: int = 100000,
+        tokens_cv: float = DEFAULT_TOKENS_CV, efficiency_cv: float = DEFAULT_EFFICIENCY_CV,
+        price_cv: float = DEFAULT_PRICE_CV, seed: Optional[int] = 0) -> Dict[str, any]:
+        """Sample num_samples scenarios and report p5/p50/p95 of each metric
+
+        With prefix caching, the cached share of each sampled prompt skips
+        prefill in roofline mode, as in calculate_inference_metrics.
+        """
+        if num_samples <= 0:
+            raise ValueError("num_samples must be positive")
+        if not 0 <= prefix_cache_hit_rate <= 1:
+            raise ValueError("prefix_cache_hit_rate must be between 0 and 1")
+        calculator = self.calculator
+        hardware = calculator.hardware_specs[hardware_type]
+        rng = np.random.default_rng(seed)
+
+        output_arr = np.maximum(_sample_lengths(rng, tokens, tokens_cv, num_samples), 1)
+        prompt_arr = np.maximum(_sample_lengths(rng, prompt_tokens, tokens_cv, num_samples), 0)
+        efficiency = _lognormal_multiplier(rng, efficiency_cv, num_samples)
+        price = _lognormal_multiplier(rng, price_cv, num_samples)
+
+        if latency_mode == LatencyMode.ROOFLINE.value:
+            cached_arr = prefix_cache_hit_rate * np.minimum(shared_prefix_tokens, prompt_arr)
+            latency_ms = self._roofline_latency_ms(model_size, hardware_type, deployment_mode, batch_size,
+                                                   output_arr, prompt_arr, cached_arr, precision, kv_precision)
+        else:
+            # The empirical model is a fixed cost per output token
+            per_token_ms = calculator.calculate_latency(
+                model_size, 1, batch_size, hardware_type, deployment_mode, latency_mode=latency_mode,
+                precision=precision, kv_precision=kv_precision)["total_latency_ms"]
+            latency_ms = output_arr * per_token_ms
+        latency_ms = latency_ms * efficiency
+
+        # Same cost model as calculate_cost, with the sampled hourly price
+        hours_per_request = latency_ms / 1000 / 3600
+        cost_per_hour = hardware.cost_per_hour * price + (hardware.power_consumption_w / 1000) * POWER_COST_PER_KWH
+        cost_per_request = hours_per_request * cost_per_hour
+        monthly_cost = cost_per_request * requests_per_hour * 24 * 30
+
+        return {
+            "inputs": {
+                "model_size": model_size,
+                "batch_size": batch_size,
+                "hardware_type": hardware_type,
+                "deployment_mode": deployment_mode,
+                "requests_per_hour": requests_per_hour,
+                "latency_mode": latency_mode,
+                "precision": precision,
+                "kv_precision": kv_precision,
+                "shared_prefix_tokens": shared_prefix_tokens,
+                "prefix_cache_hit_rate": prefix_cache_hit_rate,
+                "num_samples": num_samples,
+                "tokens_cv": tokens_cv,
+                "efficiency_cv": efficiency_cv,
+                "price_cv": price_cv
+            },
+            "latency_ms": _summary(latency_ms),
+            "tokens_per_second": _summary(output_arr / (latency_ms / 1000)),
+            "cost_per_request": _summary(cost_per_request),
+            "monthly_cost": _summary(monthly_cost)
+        }
+
+    def _roofline_latency_ms(self, model_size: str, hardware_type: str, deployment_mode: str,
+        batch_size: int, output_arr: np.ndarray, prompt_arr: np.ndarray, cached_arr: np.ndarray,
+        precision: str, kv_precision: Optional[str]) -> np.ndarray:
+        """Roofline latency of every sample, from the calculator's roofline formulas"""
+        rates = self.calculator.roofline_rates(model_size, hardware_type, precision, kv_precision)
+        phases = roofline_phase_times(rates, output_arr, batch_size, prompt_arr, cached_arr)
+        total_s = phases["prefill_s"] + phases["decode_step_s"] * phases["decode_steps"]
+        return total_s * 1000 * DEPLOYMENT_FACTORS[deployment_mode]
+
+
+def _sample_lengths(rng: np.random.Generator, lengths: Union[int, Sequence[int]], cv: float,
+    size: int) -> np.ndarray:
+    """Draw token lengths log-normally around a fixed value, or from observed lengths"""
+    if not isinstance(lengths, (int, float, np.integer, np.floating)):
+        return rng.choice(np.asarray(lengths, dtype=np.int64), size)
+    if lengths <= 0 or cv <= 0:
+        return np.full(size, int(lengths), dtype=np.int64)
+    return np.rint(lengths * _lognormal_multiplier(rng, cv, size)).astype(np.int64)
+
+
+def _lognormal_multiplier(rng: np.random.Generator, cv: float, size: int) -> np.ndarray:
+    """Log-normal samples with mean 1 and the given coefficient of variation"""
+    if cv <= 0:
+        return np.ones(size)
+    sigma = math.sqrt(math.log1p(cv * cv))
+    return rng.lognormal(-sigma * sigma / 2, sigma, size)
+
+
+def _summary(values: np.ndarray) -> Dict[str, float]:
+    """Mean and percentile bands keyed as p5, p50, p95"""
+    points = np.percentile(values, UNCERTAINTY_PERCENTILES)
+    summary = {f"p{p:g}": float(v) for p, v in zip(UNCERTAINTY_PERCENTILES, points)}
+    summary["mean"] = float(values.mean())
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point for uncertainty estimates"""
+    parser = argparse.ArgumentParser(description="Monte Carlo latency and cost bands for one scenario")
+    parser.add_argument("--model-size", default="7B")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1024])
+    parser.add_argument("--prompt-tokens", type=int, nargs="+", default=[0])
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--hardware", default="A100")
+    parser.add_argument("--deployment-mode", default="cloud")
+    parser.add_argument("--requests-per-hour", type=float, default=100)
+    parser.add_argument("--latency-mode", default="empirical")
+    parser.add_argument("--precision", default="fp16")
+    parser.add_argument("--shared-prefix-tokens", type=int, default=0)
+    parser.add_argument("--prefix-cache-hit-rate", type=float, default=0.0)
+    parser.add_argument("--samples", type=int, default=1000000)
+    parser.add_argument("--tokens-cv", type=float, default=DEFAULT_TOKENS_CV)
+    parser.add_argument("--efficiency-cv", type=float, default=DEFAULT_EFFICIENCY_CV)
+    parser.add_argument("--price-cv", type=float, default=DEFAULT_PRICE_CV)
+    args = parser.parse_args(argv)
+
+    estimator = UncertaintyEstimator()
+    result = estimator.estimate(
+        model_size=args.model_size,
+        tokens=args.tokens[0] if len(args.tokens) == 1 else args.tokens,
+        batch_size=args.batch_size,
+        hardware_type=args.hardware,
+        deployment_mode=args.deployment_mode,
+        requests_per_hour=args.requests_per_hour,
+        latency_mode=args.latency_mode,
+        prompt_tokens=args.prompt_tokens[0] if len(args.prompt_tokens) == 1 else args.prompt_tokens,
+        precision=args.precision,
+        shared_prefix_tokens=args.shared_prefix_tokens,
+        prefix_cache_hit_rate=args.prefix_cache_hit_rate,
+        num_samples=args.samples,
+        tokens_cv=args.tokens_cv,
+        efficiency_cv=args.efficiency_cv,
+        price_cv=args.price_cv
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
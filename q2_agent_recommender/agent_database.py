@@ -1,6 +1,46 @@
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
+import re
+from collections import defaultdict
+from typing import List, Dict, Any, Sequence, Set
+
+import numpy as np
+
+# Words indexed for search: letters and digits, keeping the + and # of C++/C#
+TOKEN_PATTERN = re.compile(r'[a-z0-9+#]+')
+
+# Agent list fields indexed by exact (case-insensitive) value
+ATTRIBUTE_FIELDS = ['languages', 'frameworks', 'strengths', 'capabilities']
+
+# Rule-based score of a task type listed among an agent's strengths or capabilities,
+# and of supporting all of a task's languages or frameworks (partial support scores
+# the supported share)
+STRENGTH_WEIGHT = 0.4
+CAPABILITY_WEIGHT = 0.2
+LANGUAGE_WEIGHT = 0.3
+FRAMEWORK_WEIGHT = 0.3
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case words of a text (underscores and punctuation split words)"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> List[int]:
+    """Indices of the k highest scores, highest first, lowest index first among ties
+
+    Uses argpartition, so only the selected scores are sorted.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > kth)
+    above = above[np.lexsort((above, -scores[above]))]
+    ties = np.flatnonzero(scores == kth)[:k - len(above)]
+    return above.tolist() + ties.tolist()
+
 
 class AgentDatabase:
     def __init__(self, json_path: str = None):
@@ -8,33 +48,135 @@ class AgentDatabase:
             json_path = os.path.join(os.path.dirname(__file__), 'agents_db.json')
         self.json_path = json_path
         self.agents = self._load_agents()
-    
+        self._build_indexes()
+
     def _load_agents(self) -> List[Dict[str, Any]]:
-        """Load agent information from the database"""
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    
+        """Load agent information from the database
+
+        Also sets self.version, a hash of the file contents, so results
+        derived from the catalog can be invalidated when it changes.
+        """
+        with open(self.json_path, 'rb') as f:
+            raw = f.read()
+        self.version = hashlib.sha256(raw).hexdigest()[:16]
+        return json.loads(raw.decode('utf-8'))
+
+    def _build_indexes(self):
+        """Precompute normalized lookups so queries avoid scanning every agent
+
+        Agents are referred to by their position in self.agents. The token
+        index covers the fields search_agents looks at (name, description,
+        capabilities, strengths); the attribute indexes map each lower-cased
+        language, framework, strength and capability to the agents listing it.
+        """
+        self.name_index: Dict[str, Dict[str, Any]] = {}
+        self.token_index: Dict[str, Set[int]] = defaultdict(set)
+        self.attribute_index: Dict[str, Dict[str, Set[int]]] = {field: defaultdict(set) for field in ATTRIBUTE_FIELDS}
+
+        for agent_id, agent in enumerate(self.agents):
+            self.name_index.setdefault(agent['name'].lower(), agent)
+
+            searchable = [agent['name'], agent.get('description', '')]
+            searchable += agent.get('capabilities', []) + agent.get('strengths', [])
+            for text in searchable:
+                for token in tokenize(text):
+                    self.token_index[token].add(agent_id)
+
+            for field in ATTRIBUTE_FIELDS:
+                for value in agent.get(field, []):
+                    self.attribute_index[field][value.lower()].add(agent_id)
+
+        # Indexed words, scanned for substring lookups ("script" -> "typescript")
+        self.vocabulary = sorted(self.token_index)
+        self._build_feature_matrix()
+
+    def _build_feature_matrix(self):
+        """Agent-by-feature matrix used to score task analyses in bulk
+
+        Features are ('task_type', value) for every strength and capability
+        (weighted STRENGTH_WEIGHT or CAPABILITY_WEIGHT) and ('languages',
+        value) / ('frameworks', value) one-hot columns. The matrix is stored
+        column-major, so scoring reads only the columns a task refers to.
+        """
+        self.feature_index: Dict[tuple, int] = {}
+        for field in ('capabilities', 'strengths'):
+            for value in self.attribute_index[field]:
+                self.feature_index.setdefault(('task_type', value), len(self.feature_index))
+        for field in ('languages', 'frameworks'):
+            for value in self.attribute_index[field]:
+                self.feature_index[(field, value)] = len(self.feature_index)
+
+        self.feature_matrix = np.zeros((len(self.agents), len(self.feature_index)), dtype=np.float32, order='F')
+        # Strengths are written last so they take precedence over capabilities
+        for field, key, weight in (('capabilities', 'task_type', CAPABILITY_WEIGHT),
+                                   ('strengths', 'task_type', STRENGTH_WEIGHT),
+                                   ('languages', 'languages', 1.0),
+                                   ('frameworks', 'frameworks', 1.0)):
+            for value, agent_ids in self.attribute_index[field].items():
+                self.feature_matrix[list(agent_ids), self.feature_index[(key, value)]] = weight
+
+    def _analysis_weights(self, task_analysis: Dict[str, Any]) -> Dict[int, float]:
+        """Feature column weights of a task analysis"""
+        weights = {}
+        column = self.feature_index.get(('task_type', task_analysis.get('task_type', 'general').lower()))
+        if column is not None:
+            weights[column] = 1.0
+        for field, field_weight in (('languages', LANGUAGE_WEIGHT), ('frameworks', FRAMEWORK_WEIGHT)):
+            wanted = {value.lower() for value in task_analysis.get(field, [])}
+            for value in wanted:
+                column = self.feature_index.get((field, value))
+                if column is not None:
+                    weights[column] = field_weight / len(wanted)
+        return weights
+
+    def score_analyses(self, task_analyses: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Rule-based scores of every agent for each task analysis, shape (tasks, agents)
+
+        One matrix multiply over the feature columns the analyses use.
+        """
+        weights = [self._analysis_weights(task_analysis) for task_analysis in task_analyses]
+        columns = sorted({column for task_weights in weights for column in task_weights})
+        position = {column: i for i, column in enumerate(columns)}
+        query = np.zeros((len(columns), len(weights)), dtype=np.float32)
+        for task, task_weights in enumerate(weights):
+            for column, weight in task_weights.items():
+                query[position[column], task] = weight
+        return query.T @ self.feature_matrix[:, columns].T
+
     def get_all_agents(self) -> List[Dict[str, Any]]:
         """Get all agents in the database"""
         return self.agents
-    
+
     def get_agent_by_name(self, name: str) -> Dict[str, Any]:
         """Get a specific agent by name"""
-        for agent in self.agents:
-            if agent['name'].lower() == name.lower():
-                return agent
-        return None
-    
+        return self.name_index.get(name.lower())
+
     def search_agents(self, query: str) -> List[Dict[str, Any]]:
-        """Search agents by name, description, or capabilities"""
+        """Search agents by name, description, or capabilities
+
+        An agent matches if the query is a case-insensitive substring of its
+        name, description or one of its capabilities or strengths; results
+        keep the database order. A matching field must contain the query's
+        longest word inside one of its indexed words, so only the agents
+        listed under such words are checked against the raw text.
+        """
         query = query.lower()
-        results = []
-        
-        for agent in self.agents:
-            if (query in agent['name'].lower() or 
-                query in agent['description'].lower() or
+        tokens = tokenize(query)
+        if tokens:
+            longest = max(tokens, key=len)
+            candidates = set()
+            for word in self.vocabulary:
+                if longest in word:
+                    candidates |= self.token_index[word]
+            agent_ids = sorted(candidates)
+        else:
+            agent_ids = range(len(self.agents))
+        return [self.agents[agent_id] for agent_id in agent_ids if self._matches(self.agents[agent_id], query)]
+
+    @staticmethod
+    def _matches(agent: Dict[str, Any], query: str) -> bool:
+        """Whether a lower-cased query is a substring of an agent's searched fields"""
+        return (query in agent['name'].lower() or
+                query in agent.get('description', '').lower() or
                 any(query in capability.lower() for capability in agent.get('capabilities', [])) or
-                any(query in strength.lower() for strength in agent.get('strengths', []))):
-                results.append(agent)
-        
-        return results 
\ No newline at end of file
+                any(query in strength.lower() for strength in agent.get('strengths', [])))
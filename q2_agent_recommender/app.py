@@ -1,4 +1,5 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+import json
 import os
 from recommendation_engine import RecommendationEngine
 
@@ -35,19 +36,49 @@ def recommend():
         if not task_description.strip():
             return jsonify({'error': 'Task description is required'}), 400
         
-        # Get recommendations from the engine
-        recommendations = recommendation_engine.get_recommendations(task_description)
-        task_analysis = recommendation_engine.analyze_task(task_description)
+        # Get recommendations and the task analysis they were based on
+        result = recommendation_engine.recommend(task_description)
         
         return jsonify({
             'success': True,
-            'recommendations': recommendations,
-            'task_analysis': task_analysis
+            'recommendations': result['recommendations'],
+            'task_analysis': result['task_analysis']
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/recommend/stream', methods=['GET', 'POST'])
+def recommend_stream():
+    """Server-Sent Events stream of recommendations
+    
+    Sends local 'fallback' rankings immediately, then the task 'analysis',
+    each Gemini 'recommendation' as soon as it has been received, and a
+    final 'done' event. Accepts a JSON body like /recommend, or a
+    task_description query parameter for EventSource clients.
+    """
+    if not recommendation_engine:
+        return jsonify({
+            'error': 'Recommendation engine not available. Please set GOOGLE_API_KEY environment variable.'
+        }), 500
+    
+    if request.method == 'POST':
+        task_description = (request.get_json(silent=True) or {}).get('task_description', '')
+    else:
+        task_description = request.args.get('task_description', '')
+    if not task_description.strip():
+        return jsonify({'error': 'Task description is required'}), 400
+    
+    def events():
+        try:
+            for event, data in recommendation_engine.recommend_stream(task_description):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/agents')
 def agents():
     """Page showing all available agents and their capabilities"""
@@ -92,7 +123,9 @@ def health():
     return jsonify({
         'status': 'healthy',
         'gemini_available': recommendation_engine is not None,
-        'api_key_set': bool(os.getenv('GOOGLE_API_KEY'))
+        'api_key_set': bool(os.getenv('GOOGLE_API_KEY')),
+        'cache': recommendation_engine.cache.info() if recommendation_engine else None,
+        'gemini_calls': recommendation_engine.llm.info() if recommendation_engine else None
     })
 
 if __name__ == '__main__':
@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Iterator, Optional
+
+# Seconds a caller waits for a Gemini response before falling back
+DEFAULT_TIMEOUT_SECONDS = 10.0
+
+# Gemini calls allowed in flight at once, across all requests
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class LLMTimeoutError(TimeoutError):
+    """Gemini did not answer, or no call slot freed up, before the deadline"""
+
+
+class GeminiClient:
+    """Thread-pooled Gemini calls with deadlines, a concurrency limit and single-flight
+
+    Calls run on a thread pool so the caller can stop waiting at its
+    deadline. A bounded semaphore caps the calls in flight; a slot is held
+    until the call really finishes, even if its caller has given up, so a
+    slow Gemini cannot pile up unbounded work. Concurrent calls with an
+    identical prompt share one request.
+    """
+
+    def __init__(self, model, timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='gemini')
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Response text for a prompt; raises LLMTimeoutError past the deadline
+
+        Errors raised by the Gemini call itself are re-raised to every
+        caller sharing it.
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            future = self._in_flight.get(prompt)
+            if future is not None:
+                self.coalesced += 1
+        if future is None:
+            future = self._start(prompt, deadline)
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            self._count_timeout()
+            raise LLMTimeoutError(f'Gemini did not respond within {self.timeout if timeout is None else timeout}s')
+
+    def _start(self, prompt: str, deadline: float) -> Future:
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            self._count_timeout()
+            raise LLMTimeoutError(f'All {self.max_concurrency} Gemini call slots are busy')
+        with self._lock:
+            # Another caller may have started the same prompt while we waited for a slot
+            future = self._in_flight.get(prompt)
+            if future is not None:
+                self.coalesced += 1
+                self._slots.release()
+                return future
+            future = self._executor.submit(self._call, prompt)
+            self._in_flight[prompt] = future
+            self.calls += 1
+        future.add_done_callback(lambda f: self._finished(prompt, f))
+        return future
+
+    def _call(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        """Response text chunks of a streamed call, as Gemini produces them
+
+        The whole stream shares one deadline; LLMTimeoutError is raised if
+        the next chunk has not arrived by then. Streamed calls take a slot
+        like other calls but are not shared between callers.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            self._count_timeout()
+            raise LLMTimeoutError(f'All {self.max_concurrency} Gemini call slots are busy')
+        chunks = queue.Queue()
+        self._executor.submit(self._stream_call, prompt, chunks)
+        with self._lock:
+            self.calls += 1
+        while True:
+            try:
+                kind, value = chunks.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                self._count_timeout()
+                raise LLMTimeoutError(f'Gemini did not finish streaming within {timeout}s')
+            if kind == 'error':
+                raise value
+            if kind == 'done':
+                return
+            yield value
+
+    def _stream_call(self, prompt: str, chunks: queue.Queue):
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                chunks.put(('chunk', chunk.text))
+            chunks.put(('done', None))
+        except Exception as e:
+            chunks.put(('error', e))
+        finally:
+            self._slots.release()
+
+    def _finished(self, prompt: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(prompt) is future:
+                del self._in_flight[prompt]
+        self._slots.release()
+
+    def _count_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'in_flight': len(self._in_flight), 'calls': self.calls, 'coalesced': self.coalesced,
+                    'timeouts': self.timeouts, 'timeout_seconds': self.timeout,
+                    'max_concurrency': self.max_concurrency}
@@ -1,12 +1,82 @@
 import json
 import os
 import google.generativeai as genai
-from typing import List, Dict, Any
-from agent_database import AgentDatabase
+import numpy as np
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from agent_database import AgentDatabase, top_k_indices
+from llm_client import GeminiClient, LLMTimeoutError, DEFAULT_TIMEOUT_SECONDS, DEFAULT_MAX_CONCURRENCY
+from result_cache import ResultCache, DEFAULT_CACHE_PATH
+from semantic_index import SemanticIndex
+from stream_parser import RecommendationStreamParser
+
+# Default analysis used when Gemini is unavailable or returns invalid JSON
+FALLBACK_ANALYSIS = {
+    "task_type": "general",
+    "complexity": "medium",
+    "languages": [],
+    "frameworks": [],
+    "estimated_duration": "medium",
+    "team_size": "individual",
+    "key_requirements": [],
+    "domain": "other"
+}
+
+# Agents sent to Gemini after local pre-filtering (at least top_k are always sent)
+DEFAULT_NUM_CANDIDATES = 8
+
+# Agent fields Gemini needs to judge fit; the rest is re-joined locally
+PROMPT_FIELDS = ['name', 'description', 'strengths', 'capabilities', 'languages',
+                 'frameworks', 'complexity_handling']
+
+# Weight of the text similarity between the task and an agent, next to the
+# task type (0.4), language (0.3) and framework (0.3) matches
+SEMANTIC_WEIGHT = 0.5
+
+
+def compact_agents(agents: List[Dict[str, Any]]) -> str:
+    """Whitespace-free JSON of the prompt fields of each agent"""
+    return json.dumps([{field: agent[field] for field in PROMPT_FIELDS if field in agent} for agent in agents],
+                      separators=(',', ':'), ensure_ascii=False)
+
+
+def normalize_analysis(analysis: Any) -> Dict[str, Any]:
+    """Task analysis with exactly the fields of FALLBACK_ANALYSIS, of the same types
+    
+    Raises ValueError unless the analysis is a JSON object. Fields that are
+    missing or of the wrong type take their FALLBACK_ANALYSIS value, and
+    list items that are not strings are dropped.
+    """
+    if not isinstance(analysis, dict):
+        raise ValueError("Task analysis must be a JSON object")
+    normalized = {}
+    for field, default in FALLBACK_ANALYSIS.items():
+        value = analysis.get(field)
+        if isinstance(default, list):
+            normalized[field] = [item for item in value if isinstance(item, str)] if isinstance(value, list) else []
+        else:
+            normalized[field] = value if isinstance(value, str) else default
+    return normalized
+
+
+def parse_json_response(response_text: str) -> Any:
+    """JSON from a Gemini response, which may be wrapped in a ```json fence"""
+    response_text = response_text.strip()
+    if response_text.startswith('```json'):
+        response_text = response_text[7:]
+    if response_text.endswith('```'):
+        response_text = response_text[:-3]
+    return json.loads(response_text.strip())
+
 
 class RecommendationEngine:
-    def __init__(self):
+    def __init__(self, cache: Optional[ResultCache] = None, num_candidates: int = DEFAULT_NUM_CANDIDATES):
         self.agent_db = AgentDatabase()
+        self.semantic_index = SemanticIndex(self.agent_db.agents)
+        self.num_candidates = num_candidates
+        # Gemini results survive restarts; RECOMMENDATION_CACHE_PATH="" keeps them in memory only
+        if cache is None:
+            cache = ResultCache(os.getenv('RECOMMENDATION_CACHE_PATH', DEFAULT_CACHE_PATH) or None)
+        self.cache = cache
         # Initialize Gemini 2.0 Flash
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
@@ -14,9 +84,29 @@ class RecommendationEngine:
         
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        # All Gemini calls go through the client for deadlines, concurrency limits and single-flight
+        self.llm = GeminiClient(self.model,
+                                timeout=float(os.getenv('GEMINI_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS)),
+                                max_concurrency=int(os.getenv('GEMINI_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)))
         
     def analyze_task(self, task_description: str) -> Dict[str, Any]:
-        """Analyze the given task using Gemini 2.0 Flash"""
+        """Analyze the given task using Gemini 2.0 Flash
+        
+        Successful analyses are cached by normalized task text; the fallback
+        analysis is not cached, so the task is retried on the next request.
+        """
+        try:
+            return self._analyze_task(task_description)
+        except Exception:
+            # Fallback analysis
+            return dict(FALLBACK_ANALYSIS)
+    
+    def _analyze_task(self, task_description: str) -> Dict[str, Any]:
+        """Gemini analysis of the task, normalized; raises if Gemini fails, times out or returns no object"""
+        cached = self.cache.get('analysis', task_description)
+        if cached is not None:
+            return normalize_analysis(cached)
+        
         prompt = f"""
         Analyze the following coding task and extract key characteristics:
         
@@ -37,46 +127,71 @@ class RecommendationEngine:
         Only return the JSON object, no additional text.
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            # Extract JSON from response
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            analysis = json.loads(response_text.strip())
-            return analysis
-        except Exception as e:
-            # Fallback analysis
-            return {
-                "task_type": "general",
-                "complexity": "medium",
-                "languages": [],
-                "frameworks": [],
-                "estimated_duration": "medium",
-                "team_size": "individual",
-                "key_requirements": [],
-                "domain": "other"
-            }
+        analysis = normalize_analysis(parse_json_response(self.llm.generate(prompt)))
+        self.cache.set('analysis', task_description, analysis)
+        return analysis
     
     def get_recommendations(self, task_description: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """Get top-k agent recommendations using Gemini 2.0 Flash"""
+        return self.recommend(task_description, top_k)['recommendations']
+    
+    def recommend(self, task_description: str, top_k: int = 3) -> Dict[str, Any]:
+        """Task analysis and top-k recommendations, analyzing the task only once
+        
+        Gemini recommendations are cached by normalized task text, top_k and
+        the agent catalog version. Fallback recommendations are not cached,
+        nor are Gemini recommendations built on the fallback analysis or
+        naming no known agent, so the task is retried on the next request.
+        """
+        cache_version = f'{self.agent_db.version}:{top_k}:{self.num_candidates}'
+        cached = self.cache.get('recommendations', task_description, cache_version)
+        if cached is not None:
+            return cached
+        
         # Analyze the task
-        task_analysis = self.analyze_task(task_description)
+        try:
+            task_analysis = self._analyze_task(task_description)
+        except LLMTimeoutError:
+            # Gemini is slow or saturated: answer locally instead of waiting on a second call
+            task_analysis = dict(FALLBACK_ANALYSIS)
+            return {
+                'task_analysis': task_analysis,
+                'recommendations': self._get_fallback_recommendations(task_analysis, top_k, task_description)
+            }
+        except Exception:
+            task_analysis = None
+        analyzed = task_analysis is not None
+        task_analysis = task_analysis or dict(FALLBACK_ANALYSIS)
         
-        # Get all agents
+        try:
+            prompt = self._recommendation_prompt(task_analysis, task_description, top_k)
+            result = parse_json_response(self.llm.generate(prompt))
+            recommendations = {
+                'task_analysis': task_analysis,
+                'recommendations': self._join_agent_info(result.get('recommendations', []), top_k)
+            }
+            if analyzed and recommendations['recommendations']:
+                self.cache.set('recommendations', task_description, recommendations, cache_version)
+            return recommendations
+        except Exception:
+            # Fallback to basic recommendations
+            return {
+                'task_analysis': task_analysis,
+                'recommendations': self._get_fallback_recommendations(task_analysis, top_k, task_description)
+            }
+    
+    def _recommendation_prompt(self, task_analysis: Dict[str, Any], task_description: str, top_k: int) -> str:
+        """Prompt asking Gemini to rank the best local candidates for the task"""
+        # Only the best local candidates go to Gemini, in compact form
         all_agents = self.agent_db.get_all_agents()
-        
-        # Create prompt for Gemini to recommend agents
-        agents_json = json.dumps(all_agents, indent=2)
+        candidates = self.rank_candidates(task_analysis, task_description, max(self.num_candidates, top_k))
+        agents_json = compact_agents([all_agents[agent_id] for agent_id in candidates])
         
         prompt = f"""
         You are an expert AI coding agent recommender. You have access to a knowledge base of coding agents and a task analysis.
 
         Task Analysis:
-        {json.dumps(task_analysis, indent=2)}
+        {json.dumps(task_analysis, separators=(',', ':'))}
 
         Available Agents:
         {agents_json}
@@ -86,17 +201,15 @@ class RecommendationEngine:
         For each recommendation, provide:
         1. A score from 0.0 to 1.0 (higher is better)
         2. A detailed justification explaining why this agent is a good fit
-        3. The complete agent information
 
-        Return the result in this exact JSON format:
+        Return the result in this exact JSON format, using agent names exactly as listed:
         {{
             "recommendations": [
                 {{
                     "rank": 1,
                     "agent_name": "Agent Name",
                     "score": 0.85,
-                    "justification": "Detailed explanation of why this agent is suitable...",
-                    "agent_info": {{ ... complete agent object ... }}
+                    "justification": "Detailed explanation of why this agent is suitable..."
                 }},
                 ...
             ]
@@ -104,69 +217,137 @@ class RecommendationEngine:
 
         Only return the JSON object, no additional text.
         """
+        return prompt
+    
+    def _join_agent_info(self, recommendations: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """Attach full agent records to Gemini's recommendations
+        
+        Recommendations naming an agent that is not in the database are
+        dropped and the remaining ones are re-ranked.
+        """
+        joined = []
+        for recommendation in recommendations:
+            recommendation = self._join_one(recommendation, joined)
+            if recommendation is not None:
+                joined.append(recommendation)
+        return joined[:top_k]
+    
+    def _join_one(self, recommendation: Dict[str, Any], joined: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Recommendation with its agent record and next rank, or None for unknown or repeated agents"""
+        agent = self.agent_db.get_agent_by_name(str(recommendation.get('agent_name', '')))
+        if agent is None or any(r['agent_info'] is agent for r in joined):
+            return None
+        return dict(recommendation, rank=len(joined) + 1, agent_name=agent['name'], agent_info=agent)
+    
+    def rank_candidates(self, task_analysis: Dict[str, Any], task_description: str = '', limit: int = DEFAULT_NUM_CANDIDATES) -> List[int]:
+        """Ids of the agents that best match the task, best first"""
+        return top_k_indices(self._combined_scores(task_analysis, task_description), limit)
+    
+    def _combined_scores(self, task_analysis: Dict[str, Any], task_description: str = '') -> np.ndarray:
+        """Fallback scores plus the weighted text similarity of every agent to the task"""
+        return self._combined_scores_batch([task_analysis], [task_description])[0]
+    
+    def _combined_scores_batch(self, task_analyses: List[Dict[str, Any]], task_descriptions: List[str]) -> np.ndarray:
+        """Combined scores of every agent for several tasks, shape (tasks, agents)"""
+        query_texts = [self._query_text(analysis, description) for analysis, description in zip(task_analyses, task_descriptions)]
+        return self.agent_db.score_analyses(task_analyses) + SEMANTIC_WEIGHT * self.semantic_index.similarities_batch(query_texts)
+    
+    @staticmethod
+    def _query_text(task_analysis: Dict[str, Any], task_description: str) -> str:
+        """Text matched against the semantic index; placeholder analysis values are left out"""
+        parts = [task_description] + list(task_analysis.get('key_requirements', []))
+        parts += list(task_analysis.get('languages', [])) + list(task_analysis.get('frameworks', []))
+        for field, placeholder in (('task_type', 'general'), ('domain', 'other')):
+            if task_analysis.get(field, placeholder) != placeholder:
+                parts.append(task_analysis[field])
+        return '\n'.join(parts)
+    
+    def recommend_stream(self, task_description: str, top_k: int = 3) -> Iterator[Tuple[str, Any]]:
+        """Yield (event, data) pairs as recommendations become available
+        
+        Events: 'fallback' with local recommendations, computed before any
+        Gemini call; 'analysis' with the task analysis; 'recommendation'
+        for each Gemini recommendation as soon as its JSON object has been
+        streamed; 'done' with the final result in the shape returned by
+        recommend(). Cached results skip straight to 'analysis',
+        'recommendation' and 'done'. Results are cached under the same rules
+        as recommend().
+        """
+        cache_version = f'{self.agent_db.version}:{top_k}:{self.num_candidates}'
+        cached = self.cache.get('recommendations', task_description, cache_version)
+        if cached is not None:
+            yield 'analysis', cached['task_analysis']
+            for recommendation in cached['recommendations']:
+                yield 'recommendation', recommendation
+            yield 'done', cached
+            return
+        
+        fallback = self._get_fallback_recommendations(FALLBACK_ANALYSIS, top_k, task_description)
+        yield 'fallback', fallback
         
         try:
-            response = self.model.generate_content(prompt)
-            # Extract JSON from response
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            result = json.loads(response_text.strip())
-            return result.get('recommendations', [])
-        except Exception as e:
-            # Fallback to basic recommendations
-            return self._get_fallback_recommendations(task_analysis, all_agents, top_k)
+            task_analysis = self._analyze_task(task_description)
+        except LLMTimeoutError:
+            # Gemini is slow or saturated: the local ranking is the answer
+            yield 'analysis', dict(FALLBACK_ANALYSIS)
+            yield 'done', {'task_analysis': dict(FALLBACK_ANALYSIS), 'recommendations': fallback}
+            return
+        except Exception:
+            task_analysis = None
+        analyzed = task_analysis is not None
+        task_analysis = task_analysis or dict(FALLBACK_ANALYSIS)
+        yield 'analysis', task_analysis
+        
+        joined = []
+        try:
+            parser = RecommendationStreamParser()
+            for chunk in self.llm.stream(self._recommendation_prompt(task_analysis, task_description, top_k)):
+                for recommendation in parser.feed(chunk):
+                    recommendation = self._join_one(recommendation, joined)
+                    if recommendation is not None and len(joined) < top_k:
+                        joined.append(recommendation)
+                        yield 'recommendation', recommendation
+                if len(joined) == top_k:
+                    break
+        except Exception:
+            # Keep what Gemini managed to send; otherwise rank locally with the analysis
+            if not joined:
+                joined = self._get_fallback_recommendations(task_analysis, top_k, task_description)
+            yield 'done', {'task_analysis': task_analysis, 'recommendations': joined}
+            return
+        
+        result = {'task_analysis': task_analysis, 'recommendations': joined}
+        if analyzed and joined:
+            self.cache.set('recommendations', task_description, result, cache_version)
+        yield 'done', result
     
-    def _get_fallback_recommendations(self, task_analysis: Dict[str, Any], all_agents: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    def _get_fallback_recommendations(self, task_analysis: Dict[str, Any], top_k: int, task_description: str = '') -> List[Dict[str, Any]]:
         """Fallback recommendation method if Gemini fails"""
-        recommendations = []
+        return self.get_fallback_recommendations_batch([task_analysis], top_k, [task_description])[0]
+    
+    def get_fallback_recommendations_batch(self, task_analyses: List[Dict[str, Any]], top_k: int = 3, task_descriptions: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+        """Local recommendations for several tasks at once, without any API call
         
-        # Simple scoring based on task type and capabilities
-        scored_agents = []
-        for agent in all_agents:
-            score = 0.0
-            
-            # Task type matching
-            task_type = task_analysis.get('task_type', 'general')
-            if task_type in agent.get('strengths', []):
-                score += 0.4
-            elif task_type in agent.get('capabilities', []):
-                score += 0.2
-            
-            # Language matching
-            languages = task_analysis.get('languages', [])
-            agent_languages = agent.get('languages', [])
-            if languages and agent_languages:
-                language_overlap = len(set(languages) & set(agent_languages))
-                if language_overlap > 0:
-                    score += 0.3 * (language_overlap / len(languages))
-            
-            # Framework matching
-            frameworks = task_analysis.get('frameworks', [])
-            agent_frameworks = agent.get('frameworks', [])
-            if frameworks and agent_frameworks:
-                framework_overlap = len(set(frameworks) & set(agent_frameworks))
-                if framework_overlap > 0:
-                    score += 0.3 * (framework_overlap / len(frameworks))
-            
-            scored_agents.append({
-                'agent': agent,
-                'score': score
-            })
-        
-        # Sort by score and return top-k
-        scored_agents.sort(key=lambda x: x['score'], reverse=True)
-        
-        for i, scored_agent in enumerate(scored_agents[:top_k]):
+        Agents are scored on task type, language and framework matches plus
+        the text similarity of their description, strengths and capabilities
+        to the task, as one matrix product for all tasks.
+        """
+        task_descriptions = task_descriptions or [''] * len(task_analyses)
+        scores = self._combined_scores_batch(task_analyses, task_descriptions)
+        return [self._fallback_recommendations(task_analysis, task_scores, top_k)
+                for task_analysis, task_scores in zip(task_analyses, scores)]
+    
+    def _fallback_recommendations(self, task_analysis: Dict[str, Any], scores: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        recommendations = []
+        all_agents = self.agent_db.get_all_agents()
+        for i, agent_id in enumerate(top_k_indices(scores, top_k)):
+            agent = all_agents[agent_id]
             recommendation = {
                 'rank': i + 1,
-                'agent_name': scored_agent['agent']['name'],
-                'score': round(scored_agent['score'], 2),
-                'justification': f"Recommended based on task type '{task_analysis.get('task_type', 'general')}' and language/framework compatibility.",
-                'agent_info': scored_agent['agent']
+                'agent_name': agent['name'],
+                'score': round(float(scores[agent_id]), 2),
+                'justification': f"Recommended based on task type '{task_analysis.get('task_type', 'general')}', language/framework compatibility and similarity to the task description.",
+                'agent_info': agent
             }
             recommendations.append(recommendation)
         
@@ -180,13 +361,15 @@ class RecommendationEngine:
         """
         Generate a prompt for Gemini 2.0 Flash to analyze the task and recommend agents.
         """
-        with open(self.agent_db.json_path, 'r', encoding='utf-8') as f:
-            agents_json = f.read()
+        # Without a task analysis yet, candidates are ranked on the description's words
+        all_agents = self.agent_db.get_all_agents()
+        candidates = self.rank_candidates({}, task_description, max(self.num_candidates, 3))
+        agents_json = compact_agents([all_agents[agent_id] for agent_id in candidates])
         
         prompt = f'''
 You are an expert AI coding agent recommender.
 
-You have access to a knowledge base of coding agents in JSON format (see below). Each agent has fields like name, description, company, model, strengths, capabilities, languages, frameworks, complexity_handling, system_prompt, pricing, website, and integration.
+You have access to the most relevant coding agents from a knowledge base in JSON format (see below). Each agent has the fields name, description, strengths, capabilities, languages, frameworks and complexity_handling.
 
 Given a user's natural language coding task description, do the following:
 1. Analyze the task and extract:
@@ -200,10 +383,9 @@ Given a user's natural language coding task description, do the following:
    - domain (web, mobile, data, ai, backend, frontend, fullstack, other)
 2. Using the knowledge base, recommend the top 3 most suitable coding agents for the task.
    - For each agent, provide:
-     - agent_name
+     - agent_name (exactly as in the knowledge base)
      - score (0.0 to 1.0, higher is better)
      - justification (why this agent is a good fit)
-     - agent_info (all fields from the knowledge base for that agent)
 3. Return the result in the following JSON format:
 
 {{
@@ -222,8 +404,7 @@ Given a user's natural language coding task description, do the following:
       "rank": 1,
       "agent_name": "...",
       "score": 0.85,
-      "justification": "...",
-      "agent_info": {{ ... }}
+      "justification": "..."
     }},
     ...
   ]
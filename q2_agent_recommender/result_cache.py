@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'recommendation_cache.sqlite3')
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MEMORY_ENTRIES = 1024
+
+
+def normalize_task(text: str) -> str:
+    """Case- and whitespace-insensitive form of a task description"""
+    return ' '.join(text.lower().split())
+
+
+class ResultCache:
+    """Cache of Gemini results with a TTL, backed by a SQLite file
+
+    Entries are keyed on a kind ('analysis', 'recommendations', ...), the
+    normalized task text and an optional version string (e.g. the agent
+    catalog version), so editing the catalog or rewording only whitespace
+    and case behaves as expected. Recent entries are also kept in an
+    in-memory LRU. Both stores are bounded; the oldest entries are evicted
+    first and expired entries are dropped when read. Pass path=None for a
+    memory-only cache.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at)')
+            self._db.commit()
+
+    @staticmethod
+    def make_key(kind: str, task_description: str, version: str = '') -> str:
+        payload = f'{kind}\n{version}\n{normalize_task(task_description)}'
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, kind: str, task_description: str, version: str = '') -> Optional[Any]:
+        """Cached value, or None if missing or expired"""
+        key = self.make_key(kind, task_description, version)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute('SELECT value, created_at FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1])
+            if entry is None or now - entry[1] > self.ttl_seconds:
+                if entry is not None:
+                    self._delete(key)
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, kind: str, task_description: str, value: Any, version: str = ''):
+        """Store a JSON-serializable value"""
+        key = self.make_key(kind, task_description, version)
+        entry = (value, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO results (key, value, created_at) VALUES (?, ?, ?)',
+                                 (key, json.dumps(value), entry[1]))
+                self._db.execute('DELETE FROM results WHERE key IN (SELECT key FROM results '
+                                 'ORDER BY created_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM results')
+                self._db.commit()
+
+    def info(self) -> dict:
+        with self._lock:
+            stored = self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0] if self._db else len(self._memory)
+            return {'hits': self.hits, 'misses': self.misses, 'entries': stored,
+                    'ttl_seconds': self.ttl_seconds, 'max_entries': self.max_entries}
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > min(self.memory_entries, self.max_entries):
+            self._memory.popitem(last=False)
+
+    def _delete(self, key: str):
+        self._memory.pop(key, None)
+        if self._db is not None:
+            self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+            self._db.commit()
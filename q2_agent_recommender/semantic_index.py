@@ -0,0 +1,127 @@
+import math
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from agent_database import tokenize
+
+# Width of the hashed feature space
+DEFAULT_DIMENSIONS = 2048
+
+# Agent fields whose text is indexed
+INDEXED_FIELDS = ['description', 'strengths', 'capabilities', 'languages', 'frameworks']
+
+# Common English words that carry no signal about the task
+STOP_WORDS = frozenset('''
+    a an and are as at be by can for from has have i in into is it its me my of on or our so that the
+    their this to use using we what which will with you your
+'''.split())
+
+
+def ngrams(text: str, max_n: int = 2) -> List[str]:
+    """Words of a text, without stop words, plus runs of up to max_n consecutive words"""
+    words = [word for word in tokenize(text) if word not in STOP_WORDS]
+    grams = list(words)
+    for n in range(2, max_n + 1):
+        grams += [' '.join(words[i:i + n]) for i in range(len(words) - n + 1)]
+    return grams
+
+
+@lru_cache(maxsize=65536)
+def _text_buckets(text: str, dimensions: int, max_n: int) -> Tuple[int, ...]:
+    """Hashed n-grams of a text; cached since strengths, capabilities and languages repeat across agents"""
+    # crc32 rather than hash(), which is randomized per process for strings
+    return tuple(zlib.crc32(gram.encode('utf-8')) % dimensions for gram in ngrams(text, max_n))
+
+
+class SemanticIndex:
+    """Offline text similarity between tasks and agents
+
+    Each agent is a TF-IDF vector of the hashed words and word pairs of its
+    description, strengths, capabilities, languages and frameworks, L2
+    normalized. The vectors are sparse, so they are stored column-compressed:
+    for each bucket, the agents using it (indices[indptr[b]:indptr[b + 1]])
+    and their weights (data). The index costs 8 bytes per distinct bucket of
+    an agent rather than 4 bytes per dimension, and a query only reads the
+    postings of its own buckets, so no network or model download is needed
+    and lookups stay fast for large catalogs.
+    """
+
+    def __init__(self, agents: List[Dict[str, Any]], dimensions: int = DEFAULT_DIMENSIONS, max_n: int = 2):
+        self.dimensions = dimensions
+        self.max_n = max_n
+        self.num_agents = len(agents)
+
+        # Sparse (agent, bucket, count) triples, then one dense scatter
+        rows, buckets, values = [], [], []
+        for row, agent in enumerate(agents):
+            counts = self._counts(self._agent_texts(agent))
+            rows += [row] * len(counts)
+            buckets += counts.keys()
+            values += counts.values()
+        rows, buckets = np.array(rows, dtype=np.intp), np.array(buckets, dtype=np.intp)
+        term_frequency = 1 + np.log(np.array(values, dtype=np.float32))
+
+        # Smoothed inverse document frequency of each bucket
+        document_frequency = np.bincount(buckets, minlength=dimensions).astype(np.float32)
+        self.idf = (np.log((1 + len(agents)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        weights = term_frequency * self.idf[buckets]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(agents))).astype(np.float32)
+        weights /= norms[rows]
+
+        # Postings grouped by bucket
+        order = np.argsort(buckets, kind='stable')
+        self.indices = rows[order].astype(np.int32)
+        self.data = weights[order]
+        self.indptr = np.concatenate(([0], np.cumsum(document_frequency, dtype=np.int64)))
+
+    @staticmethod
+    def _agent_texts(agent: Dict[str, Any]) -> List[str]:
+        texts = []
+        for field in INDEXED_FIELDS:
+            value = agent.get(field, '')
+            texts += [value] if isinstance(value, str) else list(value)
+        return texts
+
+    def _counts(self, texts: Iterable[str]) -> Counter:
+        """Occurrences of each hashed bucket; n-grams never span two texts"""
+        counts = Counter()
+        for text in texts:
+            counts.update(_text_buckets(text, self.dimensions, self.max_n))
+        return counts
+
+    def _weights(self, counts: Counter) -> np.ndarray:
+        """Sublinear TF-IDF vector, L2 normalized"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for bucket, count in counts.items():
+            vector[bucket] = 1 + math.log(count)
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def vectorize(self, text: str) -> np.ndarray:
+        """Query vector of a text"""
+        return self._weights(self._counts([text]))
+
+    def similarities(self, text: str) -> np.ndarray:
+        """Cosine similarity of the text to every agent, in database order"""
+        vector = self.vectorize(text)
+        query_buckets = np.flatnonzero(vector)
+        starts = self.indptr[query_buckets]
+        lengths = self.indptr[query_buckets + 1] - starts
+        # Positions of every posting of the query's buckets, in one gather
+        positions = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        scores = np.bincount(self.indices[positions],
+                             weights=self.data[positions] * np.repeat(vector[query_buckets], lengths),
+                             minlength=self.num_agents)
+        return scores.astype(np.float32)
+
+    def similarities_batch(self, texts: List[str]) -> np.ndarray:
+        """Similarities of several texts to every agent, shape (texts, agents)"""
+        if not texts:
+            return np.zeros((0, self.num_agents), dtype=np.float32)
+        return np.stack([self.similarities(text) for text in texts])
@@ -0,0 +1,52 @@
+import json
+from typing import Any, Dict, List
+
+
+class RecommendationStreamParser:
+    """Incremental parser for a streamed {"recommendations": [{...}, ...]} document
+
+    Feed response text as it arrives; each recommendation object is
+    returned as soon as its closing brace has been received. Text before
+    the first '{' (such as a ```json fence) is ignored, and only objects
+    that are direct elements of an array in the top-level object are
+    emitted. The scan is linear in the streamed text.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self._position = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add text; returns the recommendation objects completed by it"""
+        self.buffer += text
+        completed = []
+        while self._position < len(self.buffer):
+            char = self.buffer[self._position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._stack:
+                self._in_string = True
+            elif char in '{[':
+                if char == '{' and self._stack == ['{', '[']:
+                    self._object_start = self._position
+                if char == '{' or self._stack:
+                    self._stack.append(char)
+            elif char in '}]' and self._stack:
+                self._stack.pop()
+                if char == '}' and self._stack == ['{', '['] and self._object_start is not None:
+                    try:
+                        completed.append(json.loads(self.buffer[self._object_start:self._position + 1]))
+                    except ValueError:
+                        pass
+                    self._object_start = None
+            self._position += 1
+        return completed